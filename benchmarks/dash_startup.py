@@ -0,0 +1,51 @@
+"""Measures how long the layout modules of both dashboards take to import and to create.
+
+Run from the project folder after `pip install -e .`:
+    python benchmarks/dash_startup.py
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# The single page app and the layout modules of both dashboards, with the function that creates their figures or None
+LAYOUT_MODULES = {
+    "paralympics_dash.paralympics_dash": None,
+    "paralympics_dash.layout_elements": None,
+    "paralympics_dash_multi.layout_charts": "row_two",
+    "paralympics_dash_multi.layout_events": "row_two",
+}
+
+
+def benchmark_startup(layout_modules=LAYOUT_MODULES):
+    """Measures the time to import each layout module and to create its layout the first time, if it has a function
+    that creates the layout.
+
+    Each module is measured in a new Python process so nothing is already imported or cached. Dash is imported
+    before the timing starts, as every worker has to import it.
+
+    Returns:
+        dict of module name to (import time ms, first layout time ms)
+    """
+    src_dir = Path(__file__).parent.parent.joinpath("src")
+    env = dict(os.environ, PYTHONPATH=str(src_dir))
+    results = {}
+    for module, layout_function in layout_modules.items():
+        code = (
+            "import time, dash\n"
+            f"app = dash.Dash('{module}')\n"
+            "start = time.perf_counter()\n"
+            f"import {module} as layout\n"
+            "imported = time.perf_counter()\n"
+            f"{'layout.' + layout_function + '()' if layout_function else 'pass'}\n"
+            "print(imported - start, time.perf_counter() - imported)\n"
+        )
+        output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+        import_seconds, layout_seconds = map(float, output.stdout.split())
+        results[module] = (import_seconds * 1000, layout_seconds * 1000)
+    return results
+
+
+if __name__ == '__main__':
+    for module_name, (import_ms, layout_ms) in benchmark_startup().items():
+        print(f"{module_name:<40} import {import_ms:8.1f} ms  first layout {layout_ms:8.1f} ms")
@@ -0,0 +1,35 @@
+"""Compares looking up an event for a dashboard card in the data store with reading the CSV file for every lookup.
+
+Run from the project folder after `pip install -e .`:
+    python benchmarks/event_lookup.py
+"""
+import time
+
+import pandas as pd
+
+from paralympics_dash.data_store import event_data, store
+
+
+def benchmark(repeats=200):
+    """Compares looking up an event in the store with reading the CSV for every lookup, as the cards used to.
+
+    Returns:
+        dict of method name to mean time per lookup in ms
+    """
+    event_ids = list(range(1, len(store.events()) + 1))
+
+    def read_csv(event_id):
+        return pd.read_csv(event_data).loc[event_id - 1]
+
+    results = {}
+    for name, lookup in {"read_csv": read_csv, "store.event": store.event}.items():
+        start = time.perf_counter()
+        for i in range(repeats):
+            lookup(event_ids[i % len(event_ids)])
+        results[name] = (time.perf_counter() - start) / repeats * 1000
+    return results
+
+
+if __name__ == '__main__':
+    for method_name, elapsed_ms in benchmark().items():
+        print(f"{method_name:<12} {elapsed_ms:8.3f} ms per event")
@@ -0,0 +1,57 @@
+"""Compares iris prediction throughput and latency for different micro-batching window sizes.
+
+Run from the project folder after `pip install -e .`:
+    python benchmarks/micro_batching.py
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+import flask_iris
+from flask_iris.micro_batcher import MicroBatcher
+from flask_iris.model_registry import ModelRegistry
+
+
+def benchmark(windows_ms=(0, 1, 2, 5, 10), clients=32, requests_per_client=50):
+    """Measures prediction throughput and latency for concurrent single row requests.
+
+    A window of 0 calls the model directly for each request, without micro-batching.
+
+    Returns:
+        dict of window_ms to (requests per second, mean latency ms, 95th percentile latency ms)
+    """
+    registry = ModelRegistry(Path(flask_iris.__file__).parent.joinpath("model.pkl"))
+    registry.load()
+    row = [5.1, 3.5, 1.4, 0.2]
+    results = {}
+    for window_ms in windows_ms:
+        batcher = MicroBatcher(registry.predict, window_ms=window_ms) if window_ms else None
+
+        def client(_):
+            latencies = []
+            for _ in range(requests_per_client):
+                start = time.perf_counter()
+                if batcher is None:
+                    registry.predict(np.asarray([row]))
+                else:
+                    batcher.predict(row)
+                latencies.append(time.perf_counter() - start)
+            return latencies
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            latencies = [latency for client_latencies in pool.map(client, range(clients))
+                         for latency in client_latencies]
+        elapsed = time.perf_counter() - start
+        if batcher is not None:
+            batcher.close()
+        latencies_ms = np.array(latencies) * 1000
+        results[window_ms] = (len(latencies) / elapsed, latencies_ms.mean(), np.percentile(latencies_ms, 95))
+    return results
+
+
+if __name__ == '__main__':
+    for window, (per_second, mean_ms, p95_ms) in benchmark().items():
+        print(f"window={window:>3} ms  {per_second:8.0f} predictions/s  mean {mean_ms:6.2f} ms  p95 {p95_ms:6.2f} ms")
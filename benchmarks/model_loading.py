@@ -0,0 +1,51 @@
+"""Compares load times and file sizes for a large DecisionTree saved as pickle and as joblib.
+
+Run from the project folder after `pip install -e .`:
+    python benchmarks/model_loading.py
+"""
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.tree import DecisionTreeClassifier
+
+import flask_iris
+from flask_iris.serialization import dump_model, load_model
+
+
+def benchmark_load(rows=200000, repeats=5):
+    """Compares the time to load a large DecisionTree saved as pickle and as joblib with and without mmap.
+
+    The tree is trained on the iris data repeated with random noise so that it has many nodes.
+
+    Returns:
+        dict of format name to (file size MB, mean load time ms)
+    """
+    df = pd.read_csv(Path(flask_iris.__file__).parent.joinpath("data", "iris.csv"))
+    rng = np.random.default_rng(42)
+    sample = df.sample(rows, replace=True, random_state=42)
+    X = sample.iloc[:, 0:-1].to_numpy() + rng.normal(0, 0.3, (rows, 4))
+    model = DecisionTreeClassifier(random_state=42).fit(X, sample.iloc[:, -1])
+
+    settings = {"pickle": ("pickle", None), "joblib": ("joblib", None), "joblib mmap": ("joblib", "r")}
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, (model_format, mmap_mode) in settings.items():
+            model_file = Path(tmp_dir).joinpath(f"model.{model_format}")
+            model_file.write_bytes(dump_model(model, model_format))
+            start = time.perf_counter()
+            for _ in range(repeats):
+                loaded = load_model(model_file, mmap_mode=mmap_mode)
+                # Check the loaded model can be used
+                loaded.predict(X[:10])
+                del loaded
+            elapsed = (time.perf_counter() - start) / repeats
+            results[name] = (model_file.stat().st_size / 1e6, elapsed * 1000)
+    return results
+
+
+if __name__ == '__main__':
+    for format_name, (size_mb, load_ms) in benchmark_load().items():
+        print(f"{format_name:<12} {size_mb:7.1f} MB  load {load_ms:8.1f} ms")
@@ -0,0 +1,57 @@
+"""Compares the paralympics REST API login throughput for different password hash settings.
+
+Run from the project folder after `pip install -e .`:
+    python benchmarks/password_login.py
+"""
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from paralympics_rest import create_app
+
+
+def benchmark_login(methods, workers=(0,), logins=50, concurrency=8):
+    """Measures the number of /login requests per second for each password hash method and pool size.
+
+    Args:
+        methods: list of werkzeug hash methods to compare
+        workers: list of PASSWORD_HASH_WORKERS values to compare, 0 hashes on the request thread
+        logins: number of logins for each setting
+        concurrency: number of threads sending login requests at the same time
+
+    Returns:
+        dict of (method, workers) to logins per second
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # The routes are only registered with the first app created in a process, so one app is used and its config
+        # is changed for each method
+        db_file = Path(tmp_dir).joinpath("benchmark.sqlite")
+        test_app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_file}"})
+        settings = [(method, pool_workers) for pool_workers in workers for method in methods]
+        for number, (method, pool_workers) in enumerate(settings):
+            test_app.config["PASSWORD_HASH_METHOD"] = method
+            test_app.config["PASSWORD_HASH_WORKERS"] = pool_workers
+            executor = test_app.extensions.pop("password_executor", None)
+            if executor is not None:
+                executor.shutdown()
+            user = {"email": f"benchmark{number}@example.com", "password": "benchmark-password"}
+            test_app.test_client().post("/register", json=user)
+
+            def login(_):
+                return test_app.test_client().post("/login", json=user).status_code
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                statuses = list(pool.map(login, range(logins)))
+            elapsed = time.perf_counter() - start
+            assert all(status == 201 for status in statuses), f"Login failed for {method}"
+            results[(method, pool_workers)] = logins / elapsed
+    return results
+
+
+if __name__ == '__main__':
+    hash_methods = ["scrypt:32768:8:1", "scrypt:16384:8:1", "pbkdf2:sha256:600000", "pbkdf2:sha256:100000"]
+    for (hash_method, hash_workers), per_second in benchmark_login(hash_methods, workers=[0, 4]).items():
+        print(f"{hash_method:<24} workers={hash_workers}  {per_second:8.1f} logins/s")
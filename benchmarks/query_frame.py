@@ -0,0 +1,61 @@
+"""Compares building the line chart DataFrame from ORM objects with vars() against query_frame().
+
+Run from the project folder after `pip install -e .`:
+    python benchmarks/query_frame.py
+"""
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import insert, select
+
+from paralympics_data.frames import query_frame
+from paralympics_flask import create_app, db
+from paralympics_flask.models import Event
+
+
+def benchmark(rows=100000, repeats=3):
+    """Times both ways of building the DataFrame on an event table with the number of rows asked for.
+
+    A temporary database is filled with copies of the paralympic events.
+
+    Returns:
+        dict of method name to mean time in ms
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_file = Path(tmp_dir).joinpath("benchmark.sqlite")
+        app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_file}"})
+        with app.app_context():
+            # Repeat the events loaded from the CSV until the table has the number of rows asked for. Each copy has
+            # its year moved on so that country, year and type stay unique.
+            events = db.session.execute(select(Event.__table__)).mappings().all()
+            copies = []
+            for i in range(rows - len(events)):
+                event = events[i % len(events)]
+                copies.append(dict(event, id=None, year=event["year"] + 1000 * (i // len(events) + 1)))
+            db.session.execute(insert(Event), copies)
+            db.session.commit()
+
+            def orm_vars():
+                events = db.session.execute(db.select(Event)).scalars()
+                df = pd.DataFrame([vars(e) for e in events])
+                db.session.expunge_all()
+                return df
+
+            def columns():
+                return query_frame(db.session, select(Event.type, Event.year, Event.participants))
+
+            for name, method in {"vars(Event)": orm_vars, "query_frame": columns}.items():
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    df = method()
+                assert len(df) == rows
+                results[name] = (time.perf_counter() - start) / repeats * 1000
+    return results
+
+
+if __name__ == '__main__':
+    for method_name, elapsed_ms in benchmark().items():
+        print(f"{method_name:<12} {elapsed_ms:8.1f} ms")
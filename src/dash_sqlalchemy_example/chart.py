@@ -1,6 +1,9 @@
-import pandas as pd
 import plotly.express as px
+from sqlalchemy import select
+
+from dash_sqlalchemy_example.models import Event
 from dash_sqlalchemy_example.server import connection
+from paralympics_data.frames import query_frame
 
 
 def line_chart(feature):
@@ -25,7 +28,9 @@ def line_chart(feature):
         feature = feature.lower()
 
     cols = ["type", "year", "host", "events", "sports", "participants", "countries"]
-    line_chart_df = pd.read_sql_table(table_name="event", con=connection, columns=cols)
+    # countries is stored as text so it is converted to a number
+    line_chart_df = query_frame(connection, select(*[getattr(Event, col) for col in cols]),
+                                dtypes={"countries": "float64"})
 
     # Set the title for the chart using the value of 'feature'
     title_text = f"How has the number of {feature} changed over time?"
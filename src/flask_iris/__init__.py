@@ -6,7 +6,9 @@ import logging
 from flask_iris.config import app_config
 
 
-from flask_iris.create_ml_model import create_model
+from flask_iris.create_ml_model import MODEL_FILE, create_model_in_background
+from flask_iris.micro_batcher import MicroBatcher
+from flask_iris.model_registry import ModelRegistry
 
 
 def create_app(config_name='development'):
@@ -29,8 +31,20 @@ def create_app(config_name='development'):
     with app.app_context():
         from flask_iris import routes
 
-    # If the ml model file isn't present, create it
-    # Commented out, you will need to install scikit-learn if you want to run this
-    create_model("lr")
+    # Load the model once, the routes use the model in the registry instead of loading it for each prediction
+    registry = ModelRegistry(MODEL_FILE, mmap_mode=app.config.get("MODEL_MMAP_MODE"))
+    if MODEL_FILE.exists():
+        registry.load()
+    else:
+        # The app starts without waiting for training, the registry loads the model when it has been promoted.
+        # Train and promote new versions with create_ml_model.py rather than in the app.
+        create_model_in_background("lr")
+    app.extensions["model_registry"] = registry
+
+    # Optionally predict concurrent single flower requests together
+    if app.config.get("PREDICTION_BATCH_WINDOW_MS"):
+        app.extensions["micro_batcher"] = MicroBatcher(registry.predict,
+                                                       window_ms=app.config["PREDICTION_BATCH_WINDOW_MS"],
+                                                       max_batch_size=app.config["PREDICTION_MAX_BATCH_SIZE"])
 
     return app
@@ -15,6 +15,15 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
+    # Largest number of flowers accepted by the /predict route in one request
+    PREDICT_MAX_ROWS = 100000
+    # Micro-batching of concurrent single predictions, see micro_batcher.py. 0 turns micro-batching off.
+    PREDICTION_BATCH_WINDOW_MS = 0
+    PREDICTION_MAX_BATCH_SIZE = 64
+    # Seconds a request waits for its micro-batched prediction before predicting on the request thread instead
+    PREDICTION_TIMEOUT_SECONDS = 5
+    # "r" memory-maps the arrays of a model saved in joblib format, see serialization.py. None copies them.
+    MODEL_MMAP_MODE = "r"
 
 
 class ProdConfig(Config):
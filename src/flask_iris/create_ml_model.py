@@ -1,56 +1,237 @@
+"""Train, version and promote the iris prediction model.
+
+Each trained model is saved as models/model-<hash>.pkl and recorded in models/manifest.json with its accuracy and
+training time. Promoting a version copies it over model.pkl with an atomic rename, so the app, which reloads model.pkl
+when it changes, never sees a partly written file. Rolling back is promoting an earlier version.
+
+Train outside the app, e.g.:
+    python src/flask_iris/create_ml_model.py train --alg lr
+    python src/flask_iris/create_ml_model.py list
+    python src/flask_iris/create_ml_model.py promote <version>
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
+
 import pandas as pd
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
-import pickle
 
+from flask_iris.serialization import MODEL_FORMATS, dump_model
 
-def create_model(alg):
-    """Creates a model using the algorithm provided. Output serialised using pickle.
+MODEL_FILE = Path(__file__).parent.joinpath("model.pkl")
+MODEL_DIR = Path(__file__).parent.joinpath("models")
+MANIFEST_FILE = MODEL_DIR.joinpath("manifest.json")
+LOCK_FILE = MODEL_DIR.joinpath("train.lock")
+
+
+class TrainingLockedError(RuntimeError):
+    """Raised by training_lock() when another process holds the training lock."""
+
+
+@contextmanager
+def training_lock():
+    """Lock so that only one process trains or promotes a model at a time.
+
+    Creating the lock file fails if it already exists, which works across processes on Windows, Linux and macOS.
+
+    Raises:
+    TrainingLockedError: if another process holds the lock
+    """
+    MODEL_DIR.mkdir(exist_ok=True)
+    try:
+        fd = os.open(LOCK_FILE, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        raise TrainingLockedError(f"Another process is training a model. Delete {LOCK_FILE} if this is not the case.")
+    try:
+        yield
+    finally:
+        os.close(fd)
+        LOCK_FILE.unlink()
+
+
+def write_atomic(path, data):
+    """Writes bytes to a temporary file in the same folder then renames it to path, so readers never see part of it"""
+    fd, tmp_path = tempfile.mkstemp(dir=Path(path).parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def read_manifest():
+    """Returns the manifest of trained model versions and the version currently promoted."""
+    if not MANIFEST_FILE.exists():
+        return {"current": None, "versions": []}
+    return json.loads(MANIFEST_FILE.read_text())
+
+
+def write_manifest(manifest):
+    write_atomic(MANIFEST_FILE, json.dumps(manifest, indent=2).encode())
+
+
+def train_model(alg, model_format="pickle"):
+    """Trains a model using the algorithm provided and saves it as a new version. The version is not promoted.
 
     Args:
     alg: either lr (LogisticRegression) or dt (DecisionTreeClassifier)
+    model_format: 'pickle' or 'joblib', joblib files can be memory-mapped when loaded, see serialization.py
 
     Returns:
-    .pkl Pickled model
+    dict with the details of the new version, as recorded in the manifest
 
     """
-    # Check if the model.pkl file exists
-    path_exists = Path.exists(Path(__file__).parent.joinpath("model.pkl"))
-
-    if not path_exists:
-        # Read the data into a DataFrame
-        iris_file = Path(__file__).parent.joinpath("data", "iris.csv")
-        df = pd.read_csv(iris_file)
-
-        # Convert categorical data to numeric
-        le = LabelEncoder()
-        df["species"] = le.fit_transform(df["species"])
-
-        # X = feature values (case sepal length, sepal width, petal length, petal width)
-        X = df.iloc[:, 0:-1]
-        X = X.values
-        # y = target values, last column of the data frame
-        y = df.iloc[:, -1]
-
-        # Split the data into 80% training and 20% testing (type of iris)
-        x_train, x_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
-        )
-
-        # Initialize the model
-        if alg == "dt":
-            model = DecisionTreeClassifier()
-        elif alg == "lr":
-            model = LogisticRegression()
+    # Imported here so that importing this module, e.g. in create_app, does not load scikit-learn
+    from sklearn.tree import DecisionTreeClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import LabelEncoder
+
+    start = time.perf_counter()
+
+    # Read the data into a DataFrame
+    iris_file = Path(__file__).parent.joinpath("data", "iris.csv")
+    df = pd.read_csv(iris_file)
+
+    # Convert categorical data to numeric
+    le = LabelEncoder()
+    df["species"] = le.fit_transform(df["species"])
+
+    # X = feature values (case sepal length, sepal width, petal length, petal width)
+    X = df.iloc[:, 0:-1]
+    X = X.values
+    # y = target values, last column of the data frame
+    y = df.iloc[:, -1]
+
+    # Split the data into 80% training and 20% testing (type of iris)
+    x_train, x_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42
+    )
+
+    # Initialize the model
+    if alg == "dt":
+        model = DecisionTreeClassifier()
+    elif alg == "lr":
+        model = LogisticRegression()
+    else:
+        raise ValueError("Must provide either 'dt' (DecisionTree) or 'lr' (LogisticRegression)")
+
+    # Train the model
+    model.fit(x_train, y_train)
+    accuracy = model.score(x_test, y_test)
+    training_seconds = time.perf_counter() - start
+
+    # Serialize the model and save it with a name that includes the hash of its contents
+    model_bytes = dump_model(model, model_format)
+    version = hashlib.sha256(model_bytes).hexdigest()[:12]
+    MODEL_DIR.mkdir(exist_ok=True)
+    suffix = "joblib" if model_format == "joblib" else "pkl"
+    model_path = MODEL_DIR.joinpath(f"model-{version}.{suffix}")
+    write_atomic(model_path, model_bytes)
+
+    details = {
+        "version": version,
+        "file": model_path.name,
+        "alg": alg,
+        "format": model_format,
+        "accuracy": accuracy,
+        "training_seconds": training_seconds,
+        "created_at": datetime.datetime.now(datetime.UTC).isoformat(),
+    }
+    manifest = read_manifest()
+    manifest["versions"] = [v for v in manifest["versions"] if v["version"] != version] + [details]
+    write_manifest(manifest)
+    return details
+
+
+def promote_model(version):
+    """Makes a trained version the model used by the app by atomically replacing model.pkl.
+
+    model.pkl keeps its name whichever format the version was saved in, as the app loads both formats.
+
+    Args:
+    version: version from the manifest, e.g. returned by train_model()
+    """
+    manifest = read_manifest()
+    details = next((v for v in manifest["versions"] if v["version"] == version), None)
+    if details is None:
+        raise ValueError(f"Model version {version} is not in {MANIFEST_FILE}")
+    write_atomic(MODEL_FILE, MODEL_DIR.joinpath(details["file"]).read_bytes())
+    manifest["current"] = version
+    write_manifest(manifest)
+
+
+def create_model(alg):
+    """Trains and promotes a model using the algorithm provided, if there is no model.pkl.
+
+    If another process is already training a model this logs a warning and returns without training. Any other
+    error in training is raised.
+
+    Args:
+    alg: either lr (LogisticRegression) or dt (DecisionTreeClassifier)
+
+    """
+    if MODEL_FILE.exists():
+        return
+    try:
+        with training_lock():
+            # Check again in case another process created the model while this one was waiting
+            if not MODEL_FILE.exists():
+                details = train_model(alg)
+                promote_model(details["version"])
+    except TrainingLockedError as e:
+        logging.warning(f"Model not created: {e}")
+
+
+def create_model_in_background(alg):
+    """Starts create_model() on a background thread, so that the app can start without waiting for training."""
+    thread = threading.Thread(target=create_model, args=(alg,), name="create-model", daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and promote versions of the iris model")
+    commands = parser.add_subparsers(dest="command", required=True)
+    train = commands.add_parser("train", help="train a new model version")
+    train.add_argument("--alg", choices=["lr", "dt"], default="lr")
+    train.add_argument("--format", choices=MODEL_FORMATS, default="pickle", dest="model_format")
+    train.add_argument("--promote", action="store_true", help="promote the new version once trained")
+    promote = commands.add_parser("promote", help="make a version the model used by the app")
+    promote.add_argument("version")
+    commands.add_parser("list", help="list the trained versions")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        # Listing only reads the manifest, so it does not wait for a model that is being trained
+        manifest = read_manifest()
+        for v in manifest["versions"]:
+            current = "*" if v["version"] == manifest["current"] else " "
+            print(f"{current} {v['version']}  {v['alg']}  {v.get('format', 'pickle'):<6}  "
+                  f"accuracy={v['accuracy']:.3f}  {v['created_at']}")
+        return
+
+    with training_lock():
+        if args.command == "train":
+            details = train_model(args.alg, args.model_format)
+            print(f"Trained {details['version']} accuracy={details['accuracy']:.3f} "
+                  f"in {details['training_seconds']:.2f}s")
+            if args.promote:
+                promote_model(details["version"])
+                print(f"Promoted {details['version']}")
         else:
-            raise ValueError("Must provide either 'dt' (DecisionTree) or 'lr' (LogisticRegression)")
+            promote_model(args.version)
+            print(f"Promoted {args.version}")
 
-        # Train the model
-        model.fit(x_train, y_train)
 
-        # Pickle the model and save current folder
-        pickle_file = Path(__file__).parent.joinpath("model.pkl")
-        pickle.dump(model, open(pickle_file, "wb"))
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Micro-batching of single flower predictions.
+
+sklearn models predict many rows in about the same time as one row, so when several requests arrive at about the
+same time it is faster to predict them together. The MicroBatcher collects rows for up to window_ms after the first
+row arrives, or until max_batch_size rows are waiting, then calls the model once and returns each request its own
+result. The cost is that a request may wait up to window_ms before its prediction is made.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Collects single row predictions into batches that are predicted on a background thread.
+
+    Args:
+        predict: function that takes a 2D array of rows and returns an array with one prediction per row
+        window_ms: the longest time to wait for more rows after the first row of a batch arrives
+        max_batch_size: the most rows to predict in one batch
+    """
+
+    def __init__(self, predict, window_ms=2, max_batch_size=64):
+        self._predict = predict
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self.batch_count = 0
+        self.row_count = 0
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        """Adds a row to the next batch and returns a Future for its prediction.
+
+        Raises:
+            ValueError: if the row is not a single row of values
+        """
+        row = np.asarray(row, dtype=float)
+        if row.ndim != 1:
+            raise ValueError(f"A row must be a list of values, not an array with shape {row.shape}")
+        future = Future()
+        self._queue.put((row, future))
+        return future
+
+    def predict(self, row, timeout=None):
+        """Returns the prediction for a single row, waiting until its batch has been predicted."""
+        return self.submit(row).result(timeout)
+
+    def is_alive(self):
+        """Returns True if the background thread is running and will predict submitted rows."""
+        return self._thread.is_alive()
+
+    def close(self):
+        """Stops the background thread once the rows already submitted have been predicted."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _next_batch(self):
+        """Waits for a row, then collects more rows until the window ends or the batch is full."""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Put the stop signal back so the loop ends after this batch
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                # Rows with a different number of values than the others fail the batch rather than the thread
+                rows = np.vstack([row for row, _ in batch])
+                predictions = self._predict(rows)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batch_count += 1
+            self.row_count += len(batch)
+            for (_, future), prediction in zip(batch, predictions):
+                future.set_result(prediction)
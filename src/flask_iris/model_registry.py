@@ -0,0 +1,84 @@
+import logging
+import threading
+import time
+from pathlib import Path
+
+from flask_iris.serialization import load_model
+
+
+class ModelRegistry:
+    """Holds the prediction model in memory so it is not loaded from disk for every prediction.
+
+    The model is loaded once when the app is created. Each time the model is used the modification time of the model
+    file is checked, and if the file has changed the new model is loaded and swapped in. Requests that are already
+    using the old model finish with it.
+
+    Args:
+        model_file: path to the model saved in pickle or joblib format
+        mmap_mode: 'r' to memory-map the arrays of a joblib model so they are shared by worker processes, or None
+    """
+
+    def __init__(self, model_file, mmap_mode=None):
+        self.model_file = Path(model_file)
+        self.mmap_mode = mmap_mode
+        self._lock = threading.Lock()
+        # The model and the modification time of the file it was loaded from are replaced together
+        self._loaded = (None, None)
+        self.load_count = 0
+        self.load_seconds = 0.0
+        self.predict_count = 0
+        self.predict_seconds = 0.0
+
+    def load(self):
+        """Loads the model from the model file and makes it the current model."""
+        mtime = self.model_file.stat().st_mtime_ns
+        start = time.perf_counter()
+        model = load_model(self.model_file, mmap_mode=self.mmap_mode)
+        elapsed = time.perf_counter() - start
+        self._loaded = (model, mtime)
+        self.load_count += 1
+        self.load_seconds += elapsed
+        logging.info(f"Loaded model from {self.model_file} in {elapsed * 1000:.1f} ms")
+        return model
+
+    def get_model(self):
+        """Returns the current model, reloading it first if the model file has changed."""
+        model, mtime = self._loaded
+        try:
+            file_mtime = self.model_file.stat().st_mtime_ns
+        except OSError:
+            # The file is being replaced, keep using the current model
+            file_mtime = mtime
+        if model is None or file_mtime != mtime:
+            with self._lock:
+                model, mtime = self._loaded
+                if model is None or file_mtime != mtime:
+                    try:
+                        model = self.load()
+                    except Exception as e:
+                        # A partly written file can't be loaded, the current model is used until the next check
+                        if model is None:
+                            raise
+                        logging.error(f"Could not reload the model from {self.model_file}: {e}")
+        return model
+
+    def predict(self, input_values):
+        """Returns the model prediction for a 2D array of input values and records the time taken."""
+        model = self.get_model()
+        start = time.perf_counter()
+        prediction = model.predict(input_values)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.predict_count += 1
+            self.predict_seconds += elapsed
+        return prediction
+
+    def stats(self):
+        """Returns the model load and prediction times as a dictionary."""
+        return {
+            "model_file": str(self.model_file),
+            "load_count": self.load_count,
+            "load_mean_ms": 1000 * self.load_seconds / self.load_count if self.load_count else 0.0,
+            "predict_count": self.predict_count,
+            "predict_mean_ms": 1000 * self.predict_seconds / self.predict_count if self.predict_count else 0.0,
+        }
@@ -1,9 +1,13 @@
-from pathlib import Path
-import pickle
-from flask import render_template, current_app as app
+from flask import render_template, request, current_app as app
 import numpy as np
+import pandas as pd
 from flask_iris.forms import PredictionForm
 
+# The order of the features expected by the model
+FEATURES = ["sepal_length", "sepal_width", "petal_length", "petal_width"]
+# Lookup table to convert the predicted numbers to the variety name, the position in the array is the number
+VARIETIES = np.array(["iris-setosa", "iris-versicolor", "iris-virginica"])
+
 
 @app.route("/", methods=["GET", "POST"])
 def index():
@@ -20,9 +24,11 @@ def index():
         ]
 
         # Make the prediction
-        prediction = make_prediction(features_from_form)
-
-        prediction_text = f"Predicted Iris type: {prediction}"
+        try:
+            prediction = make_prediction(features_from_form)
+            prediction_text = f"Predicted Iris type: {prediction}"
+        except FileNotFoundError:
+            prediction_text = "The model is still being trained, please try again shortly"
 
         return render_template(
             "index.html", form=form, prediction_text=prediction_text
@@ -49,13 +55,94 @@ def make_prediction(flower_values):
     # Convert to a 2D numpy array with float values, needed as input to the model
     input_values = np.asarray([flower_values], dtype=float)
 
-    # Get a prediction from the model
-    pickle_file = Path(__file__).parent.joinpath("model.pkl")
-    model = pickle.load(open(pickle_file, "rb"))
-    prediction = model.predict(input_values)
+    # Get a prediction from the model and convert it to the variety name
+    batcher = app.extensions.get("micro_batcher")
+    variety = None
+    if batcher is not None and batcher.is_alive():
+        # Predicted together with other requests that arrive at about the same time
+        try:
+            variety = VARIETIES[batcher.predict(input_values[0], timeout=app.config.get("PREDICTION_TIMEOUT_SECONDS"))]
+        except TimeoutError:
+            app.logger.error("The micro-batcher did not return a prediction in time, predicting on the request thread")
+    if variety is None:
+        variety = predict_varieties(input_values)[0]
+
+    return str(variety)
+
+
+def predict_varieties(input_values):
+    """Predicts the varieties for a 2D array of flower values with a single call to the model
+
+    Parameters:
+    input_values (numpy.ndarray): 2D array with one row of sepal length, sepal width, petal length, petal width for
+    each flower
+
+    Returns:
+    varieties (numpy.ndarray): Array of the predicted iris variety names
+    """
+    # The model is loaded once by the model registry when the app is created
+    prediction = app.extensions["model_registry"].predict(input_values)
+    # Index the lookup table with the whole array of predictions rather than converting them one at a time
+    return VARIETIES[prediction]
+
+
+def get_batch_input():
+    """Gets the flower values for a batch prediction from the request as a 2D numpy array
+
+    The values can be sent as:
+    - JSON list of rows, e.g. [[5.1, 3.5, 1.4, 0.2], [6.2, 2.9, 4.3, 1.3]]
+    - JSON list of objects with the feature names as keys, e.g. [{"sepal_length": 5.1, ...}]
+    - either of the above in an object, e.g. {"instances": [[5.1, 3.5, 1.4, 0.2]]}
+    - CSV file uploaded as 'file' with a header row that includes the feature names
+
+    Returns:
+    input_values (numpy.ndarray): 2D array of floats with one row per flower
+
+    Raises:
+    ValueError: if the values are missing, not numbers or not 4 values per flower
+    """
+    if "file" in request.files:
+        df = pd.read_csv(request.files["file"], usecols=FEATURES)
+        rows = df[FEATURES]
+    else:
+        data = request.get_json(silent=True)
+        rows = data.get("instances") if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            raise ValueError("Send a JSON list of flowers or upload a CSV file as 'file'")
+        if rows and isinstance(rows[0], dict):
+            rows = pd.DataFrame(rows, columns=FEATURES)
+
+    # Convert and check all the rows at once
+    input_values = np.asarray(rows, dtype=float)
+    if input_values.ndim != 2 or input_values.shape[1] != len(FEATURES) or input_values.shape[0] == 0:
+        raise ValueError(f"Each flower must have {len(FEATURES)} values: {', '.join(FEATURES)}")
+    if not np.isfinite(input_values).all():
+        raise ValueError("All values must be numbers")
+    max_rows = app.config.get("PREDICT_MAX_ROWS", 100000)
+    if input_values.shape[0] > max_rows:
+        raise ValueError(f"No more than {max_rows} flowers can be predicted in one request")
+    return input_values
+
+
+@app.route("/predict", methods=["POST"])
+def predict():
+    """Predicts the iris variety for a batch of flowers sent as JSON or a CSV file, see get_batch_input()
+
+    Returns:
+    JSON with a list of predicted variety names in the same order as the flowers, or 400 if the input is not valid
+    """
+    try:
+        input_values = get_batch_input()
+    except (ValueError, TypeError) as e:
+        return {"error": str(e)}, 400
+    try:
+        varieties = predict_varieties(input_values)
+    except FileNotFoundError:
+        return {"error": "The model is still being trained, please try again shortly"}, 503
+    return {"predictions": varieties.tolist()}
 
-    # convert the prediction to the variety name
-    varieties = {0: "iris-setosa", 1: "iris-versicolor", 2: "iris-virginica"}
-    variety = np.vectorize(varieties.__getitem__)(prediction[0])
 
-    return variety
+@app.route("/model/stats", methods=["GET"])
+def model_stats():
+    """Returns the model load time and prediction latency in JSON"""
+    return app.extensions["model_registry"].stats()
@@ -0,0 +1,53 @@
+"""Saving and loading the iris model in either pickle or joblib format.
+
+pickle stores the model as one stream, so loading it copies every array into the memory of the process. The joblib
+format writes each numpy array of the model as raw bytes after the rest of the model, so when the model is loaded
+with mmap_mode='r' the arrays are memory-mapped from the file instead of copied. The pages are read only when they
+are used and are shared through the operating system's file cache by every worker process that loads the same file.
+This makes little difference for the small iris models but matters for models with large array attributes.
+
+Not every model keeps its arrays: a scikit-learn DecisionTree copies its nodes into its own tree structure when it
+is loaded, so a joblib DecisionTree loads in about the same time as a pickled one and is not shared between workers.
+
+joblib.load also reads plain pickle files, so load_model() can be used whichever format the model was saved in.
+"""
+import io
+import pickle
+
+import joblib
+
+MODEL_FORMATS = ("pickle", "joblib")
+
+
+def dump_model(model, model_format="pickle"):
+    """Serializes the model and returns the bytes, ready to be written to a file.
+
+    Args:
+    model: trained model
+    model_format: 'pickle' or 'joblib'
+
+    Returns:
+    bytes of the serialized model
+    """
+    if model_format == "pickle":
+        return pickle.dumps(model)
+    if model_format == "joblib":
+        buffer = io.BytesIO()
+        # Compression must stay off, compressed arrays can't be memory-mapped
+        joblib.dump(model, buffer, compress=0)
+        return buffer.getvalue()
+    raise ValueError(f"Model format must be one of {', '.join(MODEL_FORMATS)}")
+
+
+def load_model(model_file, mmap_mode="r"):
+    """Loads a model saved in either format.
+
+    Args:
+    model_file: path to the model file
+    mmap_mode: 'r' to memory-map the arrays of a joblib file read only, or None to copy them into memory. Pickle files
+    are always copied into memory.
+
+    Returns:
+    the model
+    """
+    return joblib.load(model_file, mmap_mode=mmap_mode)
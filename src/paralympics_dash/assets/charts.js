@@ -0,0 +1,39 @@
+// Clientside functions used by paralympics_dash.py when CLIENTSIDE_CHARTS is True.
+// The chart data is sent to the browser once in the chart-data store, so changing the dropdown or the checklist
+// updates the charts without a request to the server.
+window.dash_clientside = Object.assign({}, window.dash_clientside);
+window.dash_clientside.paralympics = Object.assign({}, window.dash_clientside.paralympics, {
+    // Returns the line chart for the feature, e.g. 'events', using the tidy data and the styles of the stored figure
+    lineChart: function (feature, chartData) {
+        if (!chartData) {
+            return window.dash_clientside.no_update;
+        }
+        const base = chartData.line.figure;
+        const data = chartData.line.data;
+        // One trace for each event type, the trace name is the type
+        const traces = base.data.map(function (trace) {
+            const x = [];
+            const y = [];
+            data.type.forEach(function (type, i) {
+                if (type === trace.name) {
+                    x.push(data.year[i]);
+                    y.push(data[feature][i]);
+                }
+            });
+            return Object.assign({}, trace, {x: x, y: y});
+        });
+        const layout = Object.assign({}, base.layout, {
+            title: Object.assign({}, base.layout.title, {text: `How has the number of ${feature} changed over time?`})
+        });
+        return {data: traces, layout: layout};
+    },
+
+    // Returns the faceted bar chart for the list of selected event types
+    barChart: function (eventTypes, chartData) {
+        if (!chartData) {
+            return window.dash_clientside.no_update;
+        }
+        const key = (eventTypes || []).slice().sort().join(",");
+        return chartData.bar[key];
+    }
+});
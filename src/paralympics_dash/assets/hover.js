@@ -0,0 +1,32 @@
+// Clientside functions used by paralympics_dash.py, Dash loads every .js file in the assets folder
+window.dash_clientside = Object.assign({}, window.dash_clientside);
+window.dash_clientside.paralympics = Object.assign({}, window.dash_clientside.paralympics, {
+    // Waits until the mouse has stayed on a marker for delay ms before passing on the hover data, so moving
+    // across the map only sends one request to the server for the marker the mouse stops on.
+    // Hovering over the marker that is already shown does not send a request.
+    debounceHover: function (hoverData, delay) {
+        const state = window.dash_clientside.paralympics;
+        if (state.pending) {
+            // A newer hover replaces the one that was waiting
+            clearTimeout(state.pending.timer);
+            state.pending.resolve(window.dash_clientside.no_update);
+            state.pending = null;
+        }
+        if (!hoverData) {
+            return window.dash_clientside.no_update;
+        }
+        const eventId = hoverData.points[0].customdata[0];
+        return new Promise(function (resolve) {
+            const timer = setTimeout(function () {
+                state.pending = null;
+                if (eventId === state.lastEventId) {
+                    resolve(window.dash_clientside.no_update);
+                } else {
+                    state.lastEventId = eventId;
+                    resolve(hoverData);
+                }
+            }, delay);
+            state.pending = {timer: timer, resolve: resolve};
+        });
+    }
+});
@@ -0,0 +1,10 @@
+"""In-memory store for the paralympics data used by the dashboard figures, see paralympics_data.event_store."""
+from pathlib import Path
+
+from paralympics_data.event_store import EventDataStore
+
+event_data = Path(__file__).parent.parent.parent.joinpath("data", "paralympic_events.csv")
+paralympic_db = Path(__file__).parent.joinpath("paralympics_dash.sqlite")
+
+# Shared by all the figures in the app process
+store = EventDataStore(event_data, paralympic_db)
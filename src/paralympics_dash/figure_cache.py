@@ -0,0 +1,158 @@
+"""Cache of the figures and event cards returned by the dashboard callbacks.
+
+The callbacks only take a small number of input values, so each figure is built once and the JSON-ready version of
+it is kept in memory. Entries are keyed on the figure function, its arguments and the version of the data in the
+data store, so a change to the data files means the figures are rebuilt. The event cards shown when hovering over the
+map are cached in the same way, one per event id.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from itertools import combinations
+
+from plotly.io.json import to_json_plotly
+
+from paralympics_dash.data_store import store
+from paralympics_dash.figures import line_chart, bar_gender_faceted, create_card, scatter_geo
+
+# All the values that can be selected in the dropdown and the checklist
+FEATURES = ["events", "sports", "countries", "participants"]
+EVENT_TYPES = ["summer", "winter"]
+
+
+class FigureCache:
+    """Least recently used cache of figures with an optional time to live.
+
+    Args:
+        maxsize: Maximum number of figures to keep, the least recently used figure is removed when this is exceeded
+        ttl: Number of seconds a figure is kept for, or None to keep figures until they are removed by maxsize
+    """
+
+    def __init__(self, maxsize=32, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, figure_function, *args):
+        """Returns the figure for the function and arguments, creating it if it is not in the cache.
+
+        Args:
+            figure_function: Function in figures.py that returns a Plotly figure or a Dash component
+            args: Arguments for the figure function, must be hashable
+
+        Returns:
+            dict: The figure as a dictionary that only contains JSON types, can be returned from a Dash callback
+        """
+        key = (figure_function.__name__, args, store.version)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._figures.get(key)
+            if entry is not None and (self.ttl is None or now - entry[0] < self.ttl):
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Build the figure outside the lock so other callbacks are not blocked
+        result = figure_function(*args)
+        # Components don't have to_json(), they are converted the same way Dash converts callback outputs
+        figure = json.loads(result.to_json() if hasattr(result, "to_json") else to_json_plotly(result))
+
+        with self._lock:
+            self._figures[key] = (now, figure)
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.maxsize:
+                self._figures.popitem(last=False)
+                self.evictions += 1
+        return figure
+
+    def clear(self):
+        """Removes all the figures from the cache and resets the counters."""
+        with self._lock:
+            self._figures.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """Returns the cache counters as a dictionary."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._figures),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
+
+
+# Shared by all the callbacks in the app process
+figure_cache = FigureCache()
+# The cards have their own cache so that hovering over every event does not remove the figures
+card_cache = FigureCache(maxsize=64)
+
+
+def line_chart_figure(feature):
+    """Returns the cached line chart for the feature."""
+    return figure_cache.get(line_chart, feature)
+
+
+def bar_gender_faceted_figure(event_type):
+    """Returns the cached faceted bar chart for the list of event types.
+
+    The order of the selected types does not change the chart, so the list is sorted to give one cache entry per
+    combination.
+    """
+    return figure_cache.get(bar_gender_faceted, tuple(sorted(event_type)))
+
+
+def map_figure():
+    """Returns the cached map of the event locations."""
+    return figure_cache.get(scatter_geo)
+
+
+def event_card(event_id):
+    """Returns the cached card for the event id."""
+    return card_cache.get(create_card, int(event_id))
+
+
+def line_chart_data():
+    """Returns the columns used by the line chart as lists, with None for missing values."""
+    df = store.events(["type", "year"] + FEATURES)
+    df = df.astype(object).where(df.notna(), None)
+    return df.to_dict("list")
+
+
+def chart_store_data():
+    """Returns the data the browser needs to update the line and bar charts without calling the server.
+
+    The line chart is sent as the tidy data plus one figure to use for its layout and trace styles, so the browser
+    can show any feature. The faceted bar chart is sent as a figure for each combination of event types, as the
+    facet layout is worked out by Plotly Express. The key is the selected types sorted and joined with a comma.
+    """
+    bar = {}
+    for size in range(len(EVENT_TYPES) + 1):
+        for event_type in combinations(EVENT_TYPES, size):
+            bar[",".join(event_type)] = bar_gender_faceted_figure(list(event_type))
+    return {
+        "line": {"figure": line_chart_figure(FEATURES[0]), "data": figure_cache.get(line_chart_data)},
+        "bar": bar,
+    }
+
+
+def warm_figure_cache():
+    """Creates the map, and the figures and event cards for every possible input value of the callbacks."""
+    map_figure()
+    for feature in FEATURES:
+        line_chart_figure(feature)
+    for size in range(len(EVENT_TYPES) + 1):
+        for event_type in combinations(EVENT_TYPES, size):
+            bar_gender_faceted_figure(list(event_type))
+    for event_id in range(1, len(store.events(["year"])) + 1):
+        event_card(event_id)
@@ -1,14 +1,9 @@
-import sqlite3
-from pathlib import Path
-
 import dash
 import dash_bootstrap_components as dbc
-import pandas as pd
 import plotly.express as px
 from dash import html
 
-event_data = Path(__file__).parent.parent.parent.joinpath("data", "paralympic_events.csv")
-paralympic_db = Path(__file__).parent.joinpath("paralympics_dash.sqlite")
+from paralympics_dash.data_store import store
 
 
 def line_chart(feature):
@@ -32,9 +27,9 @@ def line_chart(feature):
         # Make sure it is lowercase to match the dataframe column names
         feature = feature.lower()
 
-    # Read the data from pandas into a dataframe
+    # Get the data from the in-memory data store as a dataframe
     cols = ["type", "year", "host", "events", "sports", "participants", "countries"]
-    line_chart_data = pd.read_csv(event_data, usecols=cols)
+    line_chart_data = store.events(cols)
 
     # Set the title for the chart using the value of 'feature'
     title_text = f"How has the number of {feature} changed over time?"
@@ -70,7 +65,7 @@ def bar_gender(event_type):
     :return: Plotly Express bar chart
     """
     cols = ['type', 'year', 'host', 'participants_m', 'participants_f', 'participants']
-    df_events = pd.read_csv(event_data, usecols=cols)
+    df_events = store.events(cols)
     # Drop Rome as there is no male/female data
     df_events.drop([0], inplace=True, )
     df_events.reset_index(drop=True)
@@ -104,7 +99,7 @@ def bar_gender_faceted(event_type):
     :return: Plotly Express bar chart
     """
     cols = ['type', 'year', 'host', 'participants_m', 'participants_f', 'participants']
-    df_events = pd.read_csv(event_data, usecols=cols)
+    df_events = store.events(cols)
 
     # Keep only rows where there is m/f data
     df_events = df_events[(df_events['participants_f'] >= 1)].reset_index(drop=True)
@@ -141,19 +136,8 @@ def scatter_mapbox():
     see https://plotly.com/python/scattermapbox/
 
     """
-    # create database connection
-    connection = sqlite3.connect(paralympic_db)
-
-    # define the sql query
-    sql = '''
-    SELECT event.id, event.host, event.year, location.lat, location.lon
-    FROM event
-    JOIN location ON event.host = location.city 
-    '''
-
-    df_locs = pd.read_sql(sql=sql, con=connection, index_col=None)
-    df_locs['lon'] = df_locs['lon'].astype(float)
-    df_locs['lat'] = df_locs['lat'].astype(float)
+    # Get the event locations from the in-memory data store, lat and lon are already converted to float
+    df_locs = store.locations()
 
     px.set_mapbox_access_token(open(".mapbox_token").read())
 
@@ -171,19 +155,8 @@ def scatter_mapbox():
 
 
 def scatter_geo():
-    # create database connection
-    connection = sqlite3.connect(paralympic_db)
-
-    # define the sql query
-    sql = '''
-        SELECT event.id, event.host, event.year, location.lat, location.lon
-        FROM event
-        JOIN location ON event.host = location.city 
-        '''
-
-    df_locs = pd.read_sql(sql=sql, con=connection, index_col=None)
-    df_locs['lon'] = df_locs['lon'].astype(float)
-    df_locs['lat'] = df_locs['lat'].astype(float)
+    # Get the event locations from the in-memory data store, lat and lon are already converted to float
+    df_locs = store.locations()
     df_locs['name'] = df_locs['host'] + ' ' + df_locs['year'].astype(str)
 
     # Plotly Express version
@@ -209,18 +182,17 @@ def create_card(event_id):
         card: dash boostrap components card for the event
     """
 
-    # Get the row for the event data
-    df_events = pd.read_csv(event_data)
-    ev = df_events.loc[event_id - 1]
+    # Get the data for the event from the id index in the data store
+    ev = store.event(event_id)
 
     # Variables for the card contents
-    logo = f'logos/{ev['year']}_{ev['host']}.jpg'
-    dates = f'{ev['start']} to {ev['end']}'
-    host = f'{ev['host']} {ev['year']}'
-    highlights = f'Highlights: {ev['highlights']}'
-    participants = f'{ev['participants']} athletes'
-    events = f'{ev['events']} events'
-    countries = f'{ev['countries']} countries'
+    logo = f'logos/{ev["year"]}_{ev["host"]}.jpg'
+    dates = f'{ev["start"]} to {ev["end"]}'
+    host = f'{ev["host"]} {ev["year"]}'
+    highlights = f'Highlights: {ev["highlights"]}'
+    participants = f'{ev["participants"]} athletes'
+    events = f'{ev["events"]} events'
+    countries = f'{ev["countries"]} countries'
 
     c = dbc.Card([
         dbc.CardBody(
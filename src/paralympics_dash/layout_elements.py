@@ -1,13 +1,11 @@
+"""Rows of the dashboard layout.
+
+No figures are created when this module is imported, so the app starts without reading the data. The graphs are
+empty in the layout and their figures are set by callbacks in paralympics_dash.py when the page loads.
+"""
 import dash_bootstrap_components as dbc
 from dash import html, dcc
 
-from paralympics_dash.figures import line_chart, bar_gender, scatter_geo
-
-# Figures
-map = scatter_geo()
-line = line_chart("sports")
-bar = bar_gender("winter")
-
 # Layout variables
 dropdown = dbc.Select(
     id="type-dropdown",
@@ -47,18 +45,19 @@ row_two = dbc.Row([
     ], width={"size": 2, "offset": 4}),
 ], align="start")
 
+# The figures are set by callbacks when the page loads
 row_three = dbc.Row([
     dbc.Col(children=[
-        dcc.Graph(id="line", figure=line),
+        dcc.Graph(id="line"),
     ], width=6),
     dbc.Col(children=[
-        dcc.Graph(id="bar", figure=bar),
+        dcc.Graph(id="bar"),
     ], width=6),
 ], align="start")
 
 row_four = dbc.Row([
     dbc.Col(children=[
-        dcc.Graph(id="map", figure=map)
+        dcc.Graph(id="map")
     ], width=8, align="start"),
     dbc.Col(children=[
         html.Br(),
@@ -1,7 +1,10 @@
-from dash import Dash, Output, Input
+import threading
+
+from dash import Dash, Output, Input, ClientsideFunction, dcc
 import dash_bootstrap_components as dbc
 
-from paralympics_dash.figures import line_chart, bar_gender_faceted, create_card
+from paralympics_dash.figure_cache import figure_cache, card_cache, line_chart_figure, bar_gender_faceted_figure, \
+    event_card, chart_store_data, map_figure, warm_figure_cache
 from paralympics_dash.layout_elements import row_one, row_two, row_three, row_four
 
 external_stylesheets = [dbc.themes.BOOTSTRAP]
@@ -10,6 +13,19 @@ meta_tags = [
 ]
 app = Dash(__name__, external_stylesheets=external_stylesheets, meta_tags=meta_tags)
 
+# Build every figure and card in the background when the app starts, so no callback has to wait for a figure to be
+# created. The app does not wait for this to finish. Importing this module does not start it, see
+# start_figure_cache_warmup().
+PREWARM_FIGURE_CACHE = True
+
+# Update the line and bar charts in the browser from data sent once in the chart-data store, see assets/charts.js.
+# False updates them with callbacks on the server.
+CLIENTSIDE_CHARTS = True
+
+# Milliseconds the mouse must stay on a map marker before the card is requested, see assets/hover.js.
+# 0 requests the card for every hover event.
+HOVER_DEBOUNCE_MS = 150
+
 # Layout variables are in layout_elements.py
 
 app.layout = dbc.Container([
@@ -17,38 +33,111 @@ app.layout = dbc.Container([
     row_two,
     row_three,
     row_four,
+    # Hover data for the map after it has been debounced in the browser
+    dcc.Store(id='map-hover'),
+    # Data for the line and bar charts when CLIENTSIDE_CHARTS is True
+    dcc.Store(id='chart-data'),
 ])
 
 
+# The figures are not in the layout so that the app starts without creating them. These callbacks have the id of the
+# component as their input, so they run once when the page loads.
 @app.callback(
-    Output(component_id='line', component_property='figure'),
-    Input(component_id='type-dropdown', component_property='value')
+    Output('map', 'figure'),
+    Input('map', 'id'),
 )
-def update_line_chart(chart_type):
-    figure = line_chart(chart_type)
-    return figure
+def load_map(_):
+    return map_figure()
 
 
-@app.callback(
-    Output(component_id='bar', component_property='figure'),
-    Input(component_id='checklist-input', component_property='value')
-)
-def update_line_chart(event_type):
-    figure = bar_gender_faceted(event_type)
-    return figure
+if CLIENTSIDE_CHARTS:
+    @app.callback(
+        Output('chart-data', 'data'),
+        Input('chart-data', 'id'),
+    )
+    def load_chart_data(_):
+        return chart_store_data()
+
+    # The charts are changed in the browser using the data in the chart-data store
+    app.clientside_callback(
+        ClientsideFunction(namespace='paralympics', function_name='lineChart'),
+        Output('line', 'figure'),
+        Input('type-dropdown', 'value'),
+        Input('chart-data', 'data'),
+    )
+    app.clientside_callback(
+        ClientsideFunction(namespace='paralympics', function_name='barChart'),
+        Output('bar', 'figure'),
+        Input('checklist-input', 'value'),
+        Input('chart-data', 'data'),
+    )
+else:
+    @app.callback(
+        Output(component_id='line', component_property='figure'),
+        Input(component_id='type-dropdown', component_property='value')
+    )
+    def update_line_chart(chart_type):
+        figure = line_chart_figure(chart_type)
+        return figure
+
+    @app.callback(
+        Output(component_id='bar', component_property='figure'),
+        Input(component_id='checklist-input', component_property='value')
+    )
+    def update_bar_chart(event_type):
+        figure = bar_gender_faceted_figure(event_type)
+        return figure
+
+
+if HOVER_DEBOUNCE_MS:
+    # Runs in the browser and only updates map-hover once the mouse stops on a different marker
+    app.clientside_callback(
+        f"""function(hoverData) {{
+            return window.dash_clientside.paralympics.debounceHover(hoverData, {HOVER_DEBOUNCE_MS});
+        }}""",
+        Output('map-hover', 'data'),
+        Input('map', 'hoverData'),
+    )
+    card_input = Input('map-hover', 'data')
+else:
+    card_input = Input('map', 'hoverData')
 
 
 @app.callback(
     Output('card', 'children'),
-    Input('map', 'hoverData'),
+    card_input,
 )
 def display_card(hover_data):
     if hover_data is not None:
         event_id = hover_data['points'][0]['customdata'][0]
         if event_id is not None:
-            return create_card(event_id)
+            # The card for each event is only created once and then returned from the cache
+            return event_card(event_id)
+
+
+@app.server.get("/figure-cache-stats")
+def figure_cache_stats():
+    """Returns the figure cache hit and miss counters in JSON, used to check the cache is working."""
+    return figure_cache.stats()
+
+
+@app.server.get("/card-cache-stats")
+def card_cache_stats():
+    """Returns the event card cache hit and miss counters in JSON."""
+    return card_cache.stats()
+
+
+def start_figure_cache_warmup():
+    """Starts building the figures and cards on a background thread if PREWARM_FIGURE_CACHE is True.
+
+    Called when the app is run from this module. When the app is served by a WSGI server, call it from the server's
+    startup hook for each worker, e.g. post_fork in a gunicorn config file.
+    """
+    if PREWARM_FIGURE_CACHE:
+        threading.Thread(target=warm_figure_cache, name="warm-figure-cache", daemon=True).start()
 
 
 if __name__ == '__main__':
+    start_figure_cache_warmup()
     app.run(debug=True, port=8050)
     # Runs on port 8050 by default, this just shows the parameter to use to change to another port if needed
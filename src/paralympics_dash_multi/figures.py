@@ -1,4 +1,3 @@
-import json
 import sqlite3
 from pathlib import Path
 
@@ -6,9 +5,16 @@ import pandas as pd
 import plotly.express as px
 import requests
 
+from paralympics_dash_multi.rest_client import client, CircuitOpenError
+from paralympics_data.event_store import EventDataStore
+from paralympics_data.frames import cursor_frame
+
 event_data = Path(__file__).parent.parent.parent.joinpath("data", "paralympic_events.csv")
 paralympic_db = Path(__file__).parent.joinpath("paralympics.sqlite")
 
+# Event data loaded once for the event cards
+store = EventDataStore(event_data, paralympic_db)
+
 
 def get_event_data(event_id, method):
     """
@@ -23,20 +29,15 @@ def get_event_data(event_id, method):
         ev: data for one event as a json string
     """
     if method == "rest":
-        # Use python requests to access your REST API on your localhost
-        # Make sure you run the REST APP first and check your port number if you changed it from the default 5000
-        url = f"http://127.0.0.1:5000/events/{event_id}"
-        event_response = requests.get(url)
-        ev = event_response.json()
-        return ev
+        # Uses the shared client for your REST API, see rest_client.py to change the address if it is not on port 5000
+        # If the API is not running, is slow or returns an error then the local data is used instead
+        try:
+            return client.get_json(f"/events/{event_id}")
+        except (requests.RequestException, CircuitOpenError):
+            return get_event_data(event_id, method="pandas")
     elif method == "pandas":
-        row_num = event_id + 1
-        df_events = pd.read_csv(event_data)
-        row = df_events.iloc[row_num]
-        # pandas method to convert the row, which is a Series, to json
-        ev_json = row.to_json(double_precision=0, orient="index")
-        ev = json.loads(ev_json)
-        return ev
+        # Look up the event by id in the data loaded once into the data store, the ids start from 1 as in the REST API
+        return store.event(event_id)
     else:
         raise ValueError(f'method must be one of ["rest", "pandas"]')
 
@@ -136,9 +137,9 @@ def scatter_geo():
         JOIN location ON event.host = location.city 
         '''
 
-    df_locs = pd.read_sql(sql=sql, con=connection, index_col=None)
-    df_locs['lon'] = df_locs['lon'].astype(float)
-    df_locs['lat'] = df_locs['lat'].astype(float)
+    df_locs = cursor_frame(connection.execute(sql),
+                           dtypes={"id": "int64", "year": "int64", "lat": "float64", "lon": "float64"})
+    connection.close()
     df_locs['name'] = df_locs['host'] + ' ' + df_locs['year'].astype(str)
 
     fig = px.scatter_geo(df_locs,
@@ -3,12 +3,6 @@ import dash_bootstrap_components as dbc
 from dash import html, dcc, get_asset_url
 from paralympics_dash_multi.figures import line_chart, bar_gender
 
-# Create the Plotly Express line chart object, e.g. to show number of sports
-line = line_chart("sports")
-
-# Create the Plotly Express stacked bar chart object to show gender split of participants for the type of event
-bar = bar_gender("winter")
-
 line_chart_dropdown = dbc.Select(
     id="type-dropdown",  # id uniquely identifies the element, will be needed later
     options=[
@@ -38,21 +32,30 @@ row_one = html.Div(
     ]),
 )
 
-row_two = html.Div(
-    dbc.Row([
-        dbc.Col(children=[
-            line_chart_dropdown
-        ], width=2),
-        dbc.Col(children=[
-            # Chart replaced the placeholder image
-            dcc.Graph(figure=line, id="line-chart"),
-        ], width=4),
-        dbc.Col(children=[
-            type_checklist,
-        ], width=2),
-        dbc.Col(children=[
-            # Chart replaced the placeholder image
-            dcc.Graph(figure=bar, id="bar-chart"),
-        ], width=4),
-    ], align="start")
-)
+
+def row_two():
+    """Returns the row with the charts. The figures are created when the layout is needed rather than on import."""
+    # Create the Plotly Express line chart object, e.g. to show number of sports
+    line = line_chart("sports")
+
+    # Create the Plotly Express stacked bar chart object to show gender split of participants for the type of event
+    bar = bar_gender("winter")
+
+    return html.Div(
+        dbc.Row([
+            dbc.Col(children=[
+                line_chart_dropdown
+            ], width=2),
+            dbc.Col(children=[
+                # Chart replaced the placeholder image
+                dcc.Graph(figure=line, id="line-chart"),
+            ], width=4),
+            dbc.Col(children=[
+                type_checklist,
+            ], width=2),
+            dbc.Col(children=[
+                # Chart replaced the placeholder image
+                dcc.Graph(figure=bar, id="bar-chart"),
+            ], width=4),
+        ], align="start")
+    )
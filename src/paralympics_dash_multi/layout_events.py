@@ -3,9 +3,6 @@ import dash_bootstrap_components as dbc
 from dash import html, dcc, get_asset_url
 from paralympics_dash_multi.figures import scatter_geo, get_event_data
 
-# Create the scatter map
-map = scatter_geo()
-
 
 def create_card(event_id, method):
     """
@@ -24,13 +21,13 @@ def create_card(event_id, method):
     ev = get_event_data(event_id, method)
 
     # Variables for the card contents
-    logo = f'logos/{ev['year']}_{ev['host']}.jpg'
-    dates = f'{ev['start']} to {ev['end']}'
-    host = f'{ev['host']} {ev['year']}'
-    highlights = f'Highlights: {ev['highlights']}'
-    participants = f'{ev['participants']} athletes'
-    events = f'{ev['events']} events'
-    countries = f'{ev['countries']} countries'
+    logo = f'logos/{ev["year"]}_{ev["host"]}.jpg'
+    dates = f'{ev["start"]} to {ev["end"]}'
+    host = f'{ev["host"]} {ev["year"]}'
+    highlights = f'Highlights: {ev["highlights"]}'
+    participants = f'{ev["participants"]} athletes'
+    events = f'{ev["events"]} events'
+    countries = f'{ev["countries"]} countries'
 
     card = dbc.Card([
         dbc.CardBody(
@@ -51,15 +48,6 @@ def create_card(event_id, method):
     return card
 
 
-# Create a specific instance of the card using the data for the event with id 12
-# This will be replaced next week with a dynamic input using a callback
-
-# Create the card using data from REST API, the REST app must be running on port 5000
-# card = create_card(12, method="rest")
-
-# This version uses the dataframe instead of REST API so that you don't have to run the Flask REST API app
-card = create_card(12, method="pandas")
-
 row_one = html.Div(
     dbc.Row([
         dbc.Col([html.H1("Event Details"), html.P(
@@ -68,14 +56,30 @@ row_one = html.Div(
     ]),
 )
 
-row_two = html.Div(
-    dbc.Row([
-        dbc.Col(children=[
-            # Chart replaced the placeholder image
-            dcc.Graph(figure=map, id="geo-map"),
-        ], width=8),
-        dbc.Col(children=[
-            card,
-        ], width=4),
-    ], align="start")
-)
+
+def row_two():
+    """Returns the row with the map and the card. The figure and card are created when the layout is needed rather
+    than on import, so the app can start without the data or the REST API."""
+    # Create the scatter map
+    map = scatter_geo()
+
+    # Create a specific instance of the card using the data for the event with id 12
+    # This will be replaced next week with a dynamic input using a callback
+
+    # Create the card using data from REST API, the REST app must be running on port 5000
+    # card = create_card(12, method="rest")
+
+    # This version uses the dataframe instead of REST API so that you don't have to run the Flask REST API app
+    card = create_card(12, method="pandas")
+
+    return html.Div(
+        dbc.Row([
+            dbc.Col(children=[
+                # Chart replaced the placeholder image
+                dcc.Graph(figure=map, id="geo-map"),
+            ], width=8),
+            dbc.Col(children=[
+                card,
+            ], width=4),
+        ], align="start")
+    )
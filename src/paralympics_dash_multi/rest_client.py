@@ -0,0 +1,149 @@
+"""Client for the paralympics REST API used by the dashboard.
+
+A single requests Session is shared so connections to the API are reused rather than opened for every card. Responses
+are cached for a short time, and once that time has passed the cached ETag is sent so the API can reply 304 Not
+Modified instead of sending the data again. Every request has a timeout.
+
+If the API fails or times out several times in a row the circuit breaker opens and requests fail straight away,
+without waiting for the timeout, until reset_after seconds have passed. The dashboard then uses the local data
+instead, so a slow or stopped API can't make the dashboard slow.
+
+The API address and timeouts can be changed with environment variables, e.g.
+    PARALYMPICS_API_URL=http://127.0.0.1:5001 python src/paralympics_dash_multi/paralympics_app.py
+"""
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API_BASE_URL = os.environ.get("PARALYMPICS_API_URL", "http://127.0.0.1:5000")
+# Seconds to wait to connect and to wait for the response
+API_CONNECT_TIMEOUT = float(os.environ.get("PARALYMPICS_API_CONNECT_TIMEOUT", 0.5))
+API_READ_TIMEOUT = float(os.environ.get("PARALYMPICS_API_READ_TIMEOUT", 2))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+
+class RestClient:
+    """Gets JSON from the REST API with a pooled session, a response cache and a circuit breaker.
+
+    Args:
+        base_url: address of the REST API, e.g. http://127.0.0.1:5000
+        timeout: (connect, read) timeout in seconds for each request
+        cache_ttl: seconds a response is used without asking the API if it has changed
+        retries: number of times to retry a request that fails to connect or gets a 502, 503 or 504 response
+        failure_threshold: number of failures in a row that opens the circuit breaker
+        reset_after: seconds the circuit breaker stays open before one request is allowed to try the API again
+    """
+
+    def __init__(self, base_url=API_BASE_URL, timeout=(API_CONNECT_TIMEOUT, API_READ_TIMEOUT), cache_ttl=30,
+                 retries=1, failure_threshold=3, reset_after=30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=0.1, status_forcelist=[502, 503, 504], allowed_methods=["GET"])
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=10, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        # path: (time the entry expires, ETag, JSON data)
+        self._cache = {}
+        self._failures = 0
+        self._opened_at = None
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.short_circuited = 0
+
+    def _allow_request(self):
+        """Returns True if the circuit breaker is closed, or has been open long enough to try the API again."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_after:
+                # Half open, let this request try the API. If it fails the breaker opens again.
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def _record_result(self, success):
+        with self._lock:
+            if success:
+                self._failures = 0
+                self._opened_at = None
+            else:
+                self._failures += 1
+                if self._failures >= self.failure_threshold:
+                    self._opened_at = time.monotonic()
+
+    def get_json(self, path):
+        """Returns the JSON response for a GET request to the path, e.g. /events/12
+
+        Raises:
+            CircuitOpenError: if the circuit breaker is open
+            requests.RequestException: if the request fails, times out or the response is an error
+        """
+        now = time.monotonic()
+        cached = self._cache.get(path)
+        if cached and cached[0] > now:
+            self.hits += 1
+            return cached[2]
+
+        if not self._allow_request():
+            self.short_circuited += 1
+            raise CircuitOpenError(f"{self.base_url} has failed {self._failures} times, not trying again yet")
+
+        headers = {}
+        if cached and cached[1]:
+            headers["If-None-Match"] = cached[1]
+        try:
+            response = self.session.get(self.base_url + path, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and cached:
+                data, etag = cached[2], cached[1]
+                self.revalidated += 1
+            else:
+                response.raise_for_status()
+                data, etag = response.json(), response.headers.get("ETag")
+                self.misses += 1
+        except requests.HTTPError as e:
+            # A 404 for an event that doesn't exist is not a sign the API is failing
+            self._record_result(e.response is not None and e.response.status_code < 500)
+            raise
+        except (requests.RequestException, ValueError):
+            self._record_result(False)
+            raise
+        self._record_result(True)
+        with self._lock:
+            self._cache[path] = (time.monotonic() + self.cache_ttl, etag, data)
+        return data
+
+    def clear(self):
+        """Removes all the cached responses."""
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        """Returns the cache and circuit breaker counts as a dictionary."""
+        return {
+            "base_url": self.base_url,
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "short_circuited": self.short_circuited,
+            "circuit_open": self._opened_at is not None,
+        }
+
+
+# Shared by all the callbacks in the app process
+client = RestClient()
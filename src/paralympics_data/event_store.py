@@ -0,0 +1,125 @@
+"""In-memory store for the paralympics event and location data used by the dashboard figures.
+
+The event CSV and the location data in a SQLite database are read once per process and kept in memory, so the chart
+callbacks do not re-read the files from disk on every request. The file modification times are checked on each access
+and the data is reloaded if either file has changed. Each dashboard creates a store with its own database file.
+"""
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from paralympics_data.frames import cursor_frame
+
+# Only the columns that are used by the figures and the event card are kept in memory
+EVENT_COLUMNS = ["type", "year", "host", "start", "end", "events", "sports", "countries", "participants_m",
+                 "participants_f", "participants", "highlights"]
+
+# Columns with missing values are left as float so the figures behave the same as reading the CSV with pandas
+EVENT_DTYPES = {
+    "type": "category",
+    "year": "int64",
+    "sports": "int64",
+    "events": "float64",
+    "countries": "float64",
+    "participants_m": "float64",
+    "participants_f": "float64",
+    "participants": "float64",
+}
+
+LOCATION_SQL = '''
+    SELECT event.id, event.host, event.year, location.lat, location.lon
+    FROM event
+    JOIN location ON event.host = location.city
+    '''
+
+LOCATION_DTYPES = {"id": "int64", "year": "int64", "lat": "float64", "lon": "float64"}
+
+
+class EventDataStore:
+    """Holds the event and location DataFrames and reloads them when the source files change.
+
+    Args:
+        csv_file: Path to the paralympic events CSV file
+        db_file: Path to the SQLite database with the location table
+    """
+
+    def __init__(self, csv_file, db_file):
+        self.csv_file = Path(csv_file)
+        self.db_file = Path(db_file)
+        self._lock = threading.Lock()
+        self._version = None
+        self._events = None
+        self._event_index = None
+        self._locations = None
+
+    def _file_versions(self):
+        """Returns the modification times of the source files, used to detect changes."""
+        return self.csv_file.stat().st_mtime_ns, self.db_file.stat().st_mtime_ns
+
+    def _load(self):
+        """Reads the CSV and the SQLite location data into DataFrames."""
+        events = pd.read_csv(self.csv_file, usecols=EVENT_COLUMNS, dtype=EVENT_DTYPES)
+
+        connection = sqlite3.connect(self.db_file)
+        try:
+            locations = cursor_frame(connection.execute(LOCATION_SQL), LOCATION_DTYPES)
+        finally:
+            connection.close()
+
+        # Index of event id to the values for the event, used to look up single events for the cards.
+        # The event id is the row number in the CSV file starting from 1, the same as the id in the REST API.
+        # The values are converted to JSON types so that counts are int and missing values are None.
+        records = json.loads(events.to_json(orient="records", double_precision=0))
+        event_index = dict(enumerate(records, start=1))
+
+        return events, event_index, locations
+
+    def refresh(self):
+        """Loads the data if it has not been loaded yet, or if either source file has changed on disk."""
+        version = self._file_versions()
+        if version != self._version:
+            with self._lock:
+                # Another thread may have reloaded the data while this one was waiting for the lock
+                if version != self._version:
+                    self._events, self._event_index, self._locations = self._load()
+                    self._version = version
+
+    @property
+    def version(self):
+        """Identifies the currently loaded data, changes whenever the data is reloaded."""
+        self.refresh()
+        return self._version
+
+    def events(self, cols=None):
+        """Returns the event data.
+
+        Args:
+            cols: Optional list of columns to return, all stored columns are returned if None
+
+        Returns:
+            DataFrame: A copy of the event data, so the caller can modify it
+        """
+        self.refresh()
+        if cols is None:
+            return self._events.copy()
+        return self._events[cols].copy()
+
+    def event(self, event_id):
+        """Returns the values for one event as a dict, looked up by id without searching the DataFrame.
+
+        Args:
+            event_id: id of the event, starting from 1
+
+        Raises:
+            KeyError: if there is no event with the id
+        """
+        self.refresh()
+        return dict(self._event_index[int(event_id)])
+
+    def locations(self):
+        """Returns a copy of the event id, host, year, lat and lon for each event."""
+        self.refresh()
+        return self._locations.copy()
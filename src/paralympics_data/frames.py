@@ -0,0 +1,80 @@
+"""Builds pandas DataFrames from database queries one column at a time.
+
+Creating a DataFrame from ORM objects, e.g. pd.DataFrame([vars(e) for e in events]), loads every column of every
+row, creates an object for each row and then a dict of its attributes (including SQLAlchemy's _sa_instance_state), and
+leaves pandas to work out the type of each column. query_frame() selects only the columns that are needed, fetches the
+rows as plain tuples and converts each column to a numpy array with the right dtype in one step.
+"""
+import numpy as np
+import pandas as pd
+from sqlalchemy import Float, Integer
+
+
+def column_dtype(column):
+    """Returns the numpy dtype for a selected SQLAlchemy column, based on its type and whether it can be null.
+
+    Integer columns that can be null are float64 so missing values can be NaN, the same as pandas.read_csv.
+    """
+    if isinstance(column.type, Integer):
+        return "int64" if getattr(column, "nullable", True) is False else "float64"
+    if isinstance(column.type, Float):
+        return "float64"
+    return "object"
+
+
+def frame_from_rows(columns, rows, dtypes=None):
+    """Creates a DataFrame from rows of tuples, converting each column to an array with its dtype.
+
+    Args:
+        columns: list of column names, in the same order as the values in each row
+        rows: list of tuples, one for each row
+        dtypes: optional dict of column name to dtype, e.g. 'int64', 'float64', 'category'. Columns that are not in the
+            dict are object. If the values can't be converted to the dtype the column is left as object.
+
+    Returns:
+        DataFrame with one column for each name in columns
+    """
+    dtypes = dtypes or {}
+    # Turn the rows into one tuple of values for each column
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    data = {}
+    for name, column_values in zip(columns, values):
+        dtype = dtypes.get(name, "object")
+        if dtype == "category":
+            data[name] = pd.Categorical(column_values)
+            continue
+        try:
+            data[name] = np.array(column_values, dtype=dtype)
+        except (TypeError, ValueError):
+            # e.g. a missing value in an int64 column, or text stored in a number column
+            data[name] = np.array(column_values, dtype=object)
+    return pd.DataFrame(data, columns=columns)
+
+
+def query_frame(executor, statement, dtypes=None):
+    """Runs a SQLAlchemy select of columns and returns the result as a DataFrame.
+
+    Args:
+        executor: SQLAlchemy Session or Connection, e.g. db.session
+        statement: select of the columns that are needed, e.g. select(Event.year, Event.type, Event.participants)
+        dtypes: optional dict of column name to dtype, overriding the dtypes worked out from the column types
+
+    Returns:
+        DataFrame with one column for each selected column
+    """
+    column_dtypes = {column.name: column_dtype(column) for column in statement.selected_columns}
+    column_dtypes.update(dtypes or {})
+    result = executor.execute(statement)
+    columns = list(result.keys())
+    return frame_from_rows(columns, result.all(), column_dtypes)
+
+
+def cursor_frame(cursor, dtypes=None):
+    """Returns the rows of an executed DB-API cursor, e.g. from sqlite3, as a DataFrame.
+
+    Args:
+        cursor: cursor that a SELECT has been executed on
+        dtypes: optional dict of column name to dtype, other columns are object
+    """
+    columns = [description[0] for description in cursor.description]
+    return frame_from_rows(columns, cursor.fetchall(), dtypes)
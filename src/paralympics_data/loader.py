@@ -0,0 +1,180 @@
+"""Loads the paralympics CSV data into the region and event tables of an app database.
+
+Used by the add_data() functions of the Flask and Dash apps. A manifest table records the hash of each CSV file that
+has been loaded, so when the apps start and the files have not changed the CSV files are not read at all. When a file
+has changed, or its table is empty, its rows are written in one transaction using executemany. Rows whose key is
+already in the table are skipped by default, so rows added to the end of a CSV file are inserted without touching the
+existing rows.
+
+The manifest table is added to the app's metadata, so db.drop_all() removes it along with the data tables.
+"""
+import datetime
+import hashlib
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import Column, Integer, Table, Text, literal, select
+from sqlalchemy.dialects.sqlite import insert
+
+from paralympics_data.versions import bump_table_versions, version_table
+
+DATA_DIR = Path(__file__).parent.parent.parent.joinpath("data")
+
+# The CSV file, primary key and pandas read_csv options for each table
+CSV_SOURCES = {
+    "region": {
+        "file": DATA_DIR.joinpath("noc_regions.csv"),
+        "key": "NOC",
+        # 'NA' is a valid region name so only empty values are treated as missing
+        "read_csv": {"keep_default_na": False, "na_values": [""]},
+    },
+    "event": {
+        "file": DATA_DIR.joinpath("paralympic_events.csv"),
+        "key": "id",
+        "read_csv": {},
+    },
+}
+
+MANIFEST_TABLE = "data_manifest"
+
+# Faster settings used while loading. It is safe to turn off synchronous writes as the data can be loaded again
+# from the CSV files if the load is interrupted.
+LOAD_PRAGMAS = {"synchronous": "OFF", "cache_size": "-64000", "temp_store": "MEMORY"}
+
+
+def manifest_table(metadata):
+    """Returns the manifest Table, adding it to the metadata the first time.
+
+    Args:
+        metadata: SQLAlchemy MetaData of the app database, e.g. db.metadata
+    """
+    if MANIFEST_TABLE in metadata.tables:
+        return metadata.tables[MANIFEST_TABLE]
+    return Table(
+        MANIFEST_TABLE, metadata,
+        Column("name", Text, primary_key=True),
+        Column("sha256", Text, nullable=False),
+        Column("size", Integer, nullable=False),
+        Column("mtime_ns", Integer, nullable=False),
+        Column("rows", Integer, nullable=False),
+        Column("loaded_at", Text, nullable=False),
+    )
+
+
+def file_sha256(path):
+    """Returns the SHA-256 hash of the contents of a file."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def read_csv_rows(table_name):
+    """Reads the CSV file for a table and returns the rows as a list of dicts ready to insert.
+
+    Missing values are converted to None. The event ids are the row number in the file, starting from 1.
+    """
+    source = CSV_SOURCES[table_name]
+    df = pd.read_csv(source["file"], **source["read_csv"])
+    if source["key"] == "id":
+        df.index += 1
+        df.insert(0, "id", df.index)
+    df = df.astype(object).where(df.notna(), None)
+    return df.to_dict("records")
+
+
+def load_data(db, tables=("region", "event"), update_existing=False):
+    """Loads the CSV data into the tables if the CSV files have changed since they were last loaded.
+
+    Args:
+        db: Flask-SQLAlchemy database for the app, the tables must already have been created
+        tables: names of the tables to load, in an order that satisfies the foreign keys
+        update_existing: if True, rows that are already in the table are updated with the values from the CSV,
+            otherwise only rows with a new key are inserted
+
+    Returns:
+        dict of table name to the number of rows written, tables that were skipped are not included
+    """
+    loaded = {}
+    manifest_db_table = manifest_table(db.metadata)
+    with db.engine.connect() as connection:
+        manifest_db_table.create(connection, checkfirst=True)
+        version_table(db.metadata).create(connection, checkfirst=True)
+        manifest = {row.name: row for row in connection.execute(select(manifest_db_table))}
+        connection.commit()
+
+        changed = []
+        for table_name in tables:
+            path = CSV_SOURCES[table_name]["file"]
+            stat = path.stat()
+            entry = manifest.get(table_name)
+            # The manifest is ignored if the table is empty, e.g. the rows were deleted after they were loaded
+            table = db.metadata.tables[table_name]
+            if connection.execute(select(literal(1)).select_from(table).limit(1)).first() is None:
+                entry = None
+            # Unchanged size and modification time, so the file does not need to be read
+            if entry and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+                continue
+            sha256 = file_sha256(path)
+            changed.append((table_name, sha256, stat, entry is not None and entry.sha256 == sha256))
+        connection.commit()
+        if not changed:
+            return loaded
+
+        # The connection goes back to the pool afterwards, so the settings are put back to what they were
+        original_pragmas = {name: connection.exec_driver_sql(f"PRAGMA {name}").scalar() for name in LOAD_PRAGMAS}
+        for name, value in LOAD_PRAGMAS.items():
+            connection.exec_driver_sql(f"PRAGMA {name} = {value}")
+        connection.commit()
+        try:
+            # Every table is written in one transaction
+            with connection.begin():
+                for table_name, sha256, stat, same_contents in changed:
+                    rows_written = 0
+                    if not same_contents:
+                        rows = read_csv_rows(table_name)
+                        rows_written = upsert_rows(connection, db.metadata.tables[table_name],
+                                                   CSV_SOURCES[table_name]["key"], rows, update_existing)
+                        loaded[table_name] = rows_written
+                        bump_table_versions(connection, db.metadata, [table_name])
+                    entry = {"name": table_name, "sha256": sha256, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                             "rows": rows_written, "loaded_at": datetime.datetime.now(datetime.UTC).isoformat()}
+                    statement = insert(manifest_db_table).values(entry)
+                    connection.execute(statement.on_conflict_do_update(index_elements=["name"], set_=entry))
+        finally:
+            for name, value in original_pragmas.items():
+                connection.exec_driver_sql(f"PRAGMA {name} = {value}")
+            connection.commit()
+    return loaded
+
+
+def upsert_rows(connection, table, key, rows, update_existing=False):
+    """Inserts the rows into the table with a single executemany.
+
+    Args:
+        connection: SQLAlchemy connection with an open transaction
+        table: SQLAlchemy Table
+        key: name of the primary key column
+        rows: list of dicts, one for each row
+        update_existing: if True, update rows whose key is already in the table, otherwise leave them unchanged
+
+    Returns:
+        number of rows inserted or updated
+    """
+    if not rows:
+        return 0
+    columns = [column.name for column in table.columns]
+    rows = [{column: row.get(column) for column in columns} for row in rows]
+    statement = insert(table)
+    if update_existing:
+        statement = statement.on_conflict_do_update(
+            index_elements=[key],
+            set_={column: statement.excluded[column] for column in columns if column != key},
+        )
+    else:
+        # No conflict target, so a row that matches any unique index is skipped, e.g. an event with the same country,
+        # year and type as one that was added through the app under a different id
+        statement = statement.on_conflict_do_nothing()
+    result = connection.execute(statement, rows)
+    return result.rowcount
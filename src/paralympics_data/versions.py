@@ -0,0 +1,58 @@
+"""Version numbers for the data tables, used by the apps to tell when cached responses are out of date.
+
+The versions are kept in a table in the app database, so every worker process sees a change made by any other
+worker. Routes that change a table call bump_table_versions() after they commit, and load_data() bumps the tables it
+loads. Reading the versions is a single query on a table with one row per data table.
+
+A new version row starts from a random number rather than 1, so a database that is deleted and created again does
+not repeat version numbers that clients may still have in an ETag.
+"""
+import secrets
+
+from sqlalchemy import Column, Integer, Table, Text, select
+from sqlalchemy.dialects.sqlite import insert
+
+VERSION_TABLE = "table_version"
+
+
+def version_table(metadata):
+    """Returns the table_version Table, adding it to the metadata the first time.
+
+    Args:
+        metadata: SQLAlchemy MetaData of the app database, e.g. db.metadata
+    """
+    if VERSION_TABLE in metadata.tables:
+        return metadata.tables[VERSION_TABLE]
+    return Table(
+        VERSION_TABLE, metadata,
+        Column("name", Text, primary_key=True),
+        Column("version", Integer, nullable=False),
+    )
+
+
+def get_table_versions(db, tables):
+    """Returns the current versions of the tables as a tuple, 0 for a table that has never been changed.
+
+    Args:
+        db: Flask-SQLAlchemy database for the app
+        tables: names of the tables
+    """
+    table = version_table(db.metadata)
+    statement = select(table.c.name, table.c.version).where(table.c.name.in_(tables))
+    versions = dict(db.session.execute(statement).all())
+    return tuple(versions.get(name, 0) for name in tables)
+
+
+def bump_table_versions(connection, metadata, tables):
+    """Increases the version of each table. The caller commits.
+
+    Args:
+        connection: SQLAlchemy Session or Connection, e.g. db.session
+        metadata: SQLAlchemy MetaData of the app database, e.g. db.metadata
+        tables: names of the tables that were changed
+    """
+    table = version_table(metadata)
+    for name in tables:
+        statement = insert(table).values(name=name, version=secrets.randbelow(2 ** 31))
+        connection.execute(statement.on_conflict_do_update(index_elements=["name"],
+                                                           set_={"version": table.c.version + 1}))
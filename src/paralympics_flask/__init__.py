@@ -19,6 +19,8 @@ def create_app(test_config=None):
     app.config.from_mapping(
         SECRET_KEY='create-your-own-key',
         SQLALCHEMY_DATABASE_URI="sqlite:///" + os.path.join(app.instance_path, 'paralympics_flask.sqlite'),
+        # Number of events listed on each page of the home page
+        EVENTS_PER_PAGE=20,
         # SQLALCHEMY_ECHO=True
     )
     if test_config:
@@ -33,6 +35,9 @@ def create_app(test_config=None):
     from paralympics_flask.models import User, Event, Region
     with app.app_context():
         db.create_all()
+        # create_all() does not add new indexes to tables that already exist, so add any that are missing
+        for index in Event.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
         add_data(db)
 
         from paralympics_flask import views
@@ -1,8 +1,15 @@
-import pandas as pd
+from pathlib import Path
+
+import plotly
 import plotly.express as px
 
+from paralympics_data.frames import query_frame
 from paralympics_flask.models import Event
 
+# The plotly.js bundle installed with the plotly package, served as a static file by the plotly_js route
+PLOTLY_JS_FILE = Path(plotly.__file__).parent.joinpath("package_data", "plotly.min.js")
+PLOTLY_JS_VERSION = plotly.__version__
+
 
 def line_chart(feature, db):
     """ Creates a line chart with data from paralympics_events.csv
@@ -25,10 +32,10 @@ def line_chart(feature, db):
         # Make sure it is lowercase to match the dataframe column names
         feature = feature.lower()
 
-    # Get the data from the database which returns Event objects
-    events = db.session.execute(db.select(Event)).scalars()
-    # Create a dataframe from the Event objects
-    line_chart_df = pd.DataFrame([vars(e) for e in events])
+    # Get only the columns used by the chart from the database as a dataframe
+    # countries is stored as text so the feature is converted to a number
+    line_chart_df = query_frame(db.session, db.select(Event.year, Event.type, getattr(Event, feature)),
+                                dtypes={feature: "float64"})
 
     # Set the title for the chart using the value of 'feature'
     title_text = f"How has the number of {feature} changed over time?"
@@ -53,5 +60,6 @@ def line_chart(feature, db):
                   )
 
     # Convert to a format that can be transmitted to the web page
-    plotly_jinja_data = {"fig": fig.to_html(full_html=False, include_plotlyjs=True)}
+    # plotly.js is not included, the page loads it once from the plotly_js route and the browser caches it
+    plotly_jinja_data = {"fig": fig.to_html(full_html=False, include_plotlyjs=False)}
     return plotly_jinja_data
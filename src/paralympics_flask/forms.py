@@ -5,17 +5,21 @@ from wtforms.fields.datetime import DateField
 from wtforms.fields.numeric import IntegerField
 from wtforms.fields.simple import TextAreaField, StringField
 from wtforms.validators import DataRequired
-from wtforms_sqlalchemy.fields import QuerySelectField
 
 from paralympics_flask import db
 from paralympics_flask.models import Region
+from paralympics_flask.utilities import cached_fragment
 
 
-def get_countries():
-    # You have to select the entire object and not just one attribute
-    # Then use the 'get_label=' in the QuerySelectField in the form fields to specify the column that has the values
-    # This is not clear from their documentation!
-    return db.session.execute(db.select(Region).order_by(Region.region)).scalars()
+def get_regions():
+    """Returns a dict of NOC to region name, ordered by region name.
+
+    The regions are only queried again when the region table changes, rather than every time the form is shown or
+    validated.
+    """
+    return cached_fragment("regions", ("region",), lambda: dict(
+        db.session.execute(db.select(Region.NOC, Region.region).order_by(Region.region)).all()
+    ))
 
 
 class EventForm(FlaskForm):
@@ -26,8 +30,8 @@ class EventForm(FlaskForm):
     # You could add further validation to ensure it is within a particular range.
     year = IntegerField('Year', validators=[DataRequired(), ], render_kw={"placeholder": 2020})
     # Select the country from a dropdown list based on the Region table.
-    # Uses WTForms-SQLAlchemy https://wtforms-sqlalchemy.readthedocs.io/en/latest/wtforms_sqlalchemy/
-    country = QuerySelectField('Country', query_factory=get_countries, get_label='region')
+    # The value is the NOC and the label is the region name, the choices are set in __init__ from get_regions()
+    country = SelectField('Country', validators=[DataRequired()])
     # 'NOC' is a foreign key determined by country, this will be determined in the route code
     # Alternate validation syntax, see https://wtforms.readthedocs.io/en/3.1.x/fields/#field-definitions
     host = StringField('Host city', [validators.data_required()])
@@ -47,3 +51,8 @@ class EventForm(FlaskForm):
     participants_f = IntegerField('Total number of female participants', [validators.optional()])
     participants = IntegerField('Total number of participants', [validators.optional()])
     highlights = TextAreaField('Highlights', [validators.optional(), validators.length(max=200)])
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The same cached regions are used to show the choices and to check the value that was submitted
+        self.country.choices = list(get_regions().items())
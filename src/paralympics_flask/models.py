@@ -17,9 +17,12 @@ class Region(db.Model):
 
 class Event(db.Model):
     __tablename__ = "event"
+    # There can only be one summer and one winter event in a country each year, the database rejects duplicates
+    __table_args__ = (db.Index("ix_event_country_year_type", "country", "year", "type", unique=True),)
     id: Mapped[int] = mapped_column(db.Integer, primary_key=True)
     type: Mapped[str] = mapped_column(db.Text, nullable=False)
-    year: Mapped[int] = mapped_column(db.Integer, nullable=False)
+    # Indexed as the home page lists the events in order of year
+    year: Mapped[int] = mapped_column(db.Integer, nullable=False, index=True)
     country: Mapped[str] = mapped_column(db.Text, nullable=False)
     host: Mapped[str] = mapped_column(db.Text, nullable=False)
     NOC: Mapped[str] = mapped_column(ForeignKey("region.NOC"))
@@ -1,39 +1,56 @@
-from pathlib import Path
+from flask import current_app as app
 
-import pandas as pd
-
-from paralympics_rest.models import Region, Event
+from paralympics_data.loader import load_data
+from paralympics_data.versions import bump_table_versions, get_table_versions
 
 
 def add_data(db):
     """Adds data to the database if it does not already exist.
 
+    The CSV files are only read if they have changed since they were last loaded, see paralympics_data.loader.
+
     :param db: SQLAlchemy database for the app
     """
-    # Create a connection to the REST API sqlite database using FlaskSQLAlchemy
-    connection = db.engine.connect()
-
-    # If there are no regions in the database, then add them
-    first_region = db.session.execute(db.select(Region)).first()
-    if not first_region:
-        region_file = Path(__file__).parent.parent.parent.joinpath("data", "noc_regions.csv")
-        # Read the noc_regions data to a pandas dataframe
-        na_values = [""]
-        regions_df = pd.read_csv(region_file, keep_default_na=False, na_values=na_values)
-        # Write the values to the database table
-        regions_df.to_sql("region", connection, if_exists="append", index=False)
-
-    # If there are no Events, then add them
-    first_event = db.session.execute(db.select(Event)).first()
-    if not first_event:
-        # Read the paralympics event data to a pandas dataframe
-        event_file = Path(__file__).parent.parent.parent.joinpath("data", "paralympic_events.csv")
-        events_df = pd.read_csv(event_file)
-
-        # Write the pandas DataFrame contents to the database tables
-        # For the event table we want the pandas index, but it needs to start from 1 and not 0
-        events_df.index += 1
-        events_df.to_sql("event", connection, if_exists="append", index_label='id')
-
-    # Close the database connection
-    connection.close()
+    load_data(db)
+
+
+def get_table_version(*tables):
+    """Returns the current versions of the tables as a tuple.
+
+    The versions are stored in the database so every worker process sees the same versions, see
+    paralympics_data.versions.
+
+    :param tables: names of the tables
+    """
+    return get_table_versions(app.extensions["sqlalchemy"], tables)
+
+
+def bump_table_version(*tables):
+    """Increases the version of the tables so that fragments that use them are rendered again.
+
+    Call before the commit that changes the tables, so the new versions are saved in the same transaction.
+
+    :param tables: names of the tables that were changed
+    """
+    db = app.extensions["sqlalchemy"]
+    bump_table_versions(db.session, db.metadata, tables)
+
+
+def cached_fragment(key, tables, render):
+    """Returns a rendered fragment of HTML from the cache, or renders it if the tables have changed since it was cached.
+
+    Any value made from the tables can be cached this way, e.g. the list of regions used by a form.
+    Only the latest version of each fragment is kept. The cache is held by each worker process, but the versions are
+    read from the database so a change made through any worker renders the fragment again.
+
+    :param key: name for the fragment, including any arguments that change the fragment
+    :param tables: names of the tables the fragment is made from
+    :param render: function with no arguments that returns the fragment
+    """
+    cache = app.extensions.setdefault("fragment_cache", {})
+    version = get_table_version(*tables)
+    entry = cache.get(key)
+    if entry is None or entry[0] != version:
+        entry = (version, render())
+        cache[key] = entry
+    return entry[1]
@@ -1,17 +1,38 @@
-from flask import current_app as app, render_template, flash, request, redirect, url_for
-from sqlalchemy.exc import SQLAlchemyError
+import math
 
-from paralympics_flask.figures import line_chart
+from flask import current_app as app, render_template, flash, request, redirect, url_for, abort, send_file
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from paralympics_flask.figures import line_chart, PLOTLY_JS_FILE, PLOTLY_JS_VERSION
 from paralympics_flask import db
-from paralympics_flask.forms import EventForm
-from paralympics_flask.models import Event, Region
+from paralympics_flask.forms import EventForm, get_regions
+from paralympics_flask.models import Event
+from paralympics_flask.utilities import bump_table_version, cached_fragment
+
+# The plotly.js URL includes the version so browsers can cache it for a year
+PLOTLY_JS_MAX_AGE = 365 * 24 * 60 * 60
 
 
 @app.route('/', methods=['GET'])
 def index():
-    """ Returns the home page."""
-    events = db.session.execute(db.select(Event).order_by(Event.year)).scalars()
-    return render_template('index.html', events=events)
+    """ Returns the home page with one page of events, e.g. /?page=2 """
+    per_page = app.config['EVENTS_PER_PAGE']
+    # Keep the page number in range so that only real pages are added to the cache
+    event_count = cached_fragment("event_count", ("event",), lambda: db.session.scalar(db.select(func.count(Event.id))))
+    last_page = max(1, math.ceil(event_count / per_page))
+    page = min(max(request.args.get('page', 1, type=int), 1), last_page)
+
+    def render_events():
+        # id is included in the order so that events in the same year are always on the same page
+        query = db.select(Event).order_by(Event.year, Event.id)
+        pagination = db.paginate(query, page=page, per_page=per_page, error_out=False)
+        return render_template('event_list.html', pagination=pagination)
+
+    # The list is only rendered again when the event table changes. The rest of the page is not cached as it
+    # includes the flashed messages.
+    events_html = cached_fragment(f"index:{page}:{per_page}", ("event",), render_events)
+    return render_template('index.html', events_html=events_html)
 
 
 @app.get('/events/<event_id>')
@@ -34,13 +55,10 @@ def add_event():
         # Add attributes to the event object using the form fields
         form.populate_obj(event)
 
-        # Change the event.country from an object to just the region name
-        country = event.country.region
-        event.country = country
-
-        # Find the region to add the foreign key field to the event
-        region = db.session.execute(db.select(Region).filter_by(region=country)).scalar_one()
-        event.NOC = region.NOC
+        # The form value is the NOC, which is the foreign key for the event, and the country is the region name.
+        # The region name comes from the same cached regions that the form was validated against.
+        event.NOC = form.country.data
+        event.country = get_regions()[event.NOC]
 
         # Calculate the duration by subtracting the start date from the end date if they are not None
         if event.start and event.end:
@@ -53,22 +71,21 @@ def add_event():
         disabilities = ','.join(map(str, event.disabilities_included))
         event.disabilities_included = disabilities
 
-        # Check that the event host and year do not already exist.
-        exists = db.session.execute(db.select(Event).filter_by(country=event.country, year=event.year)).first()
-        if not exists:
-            try:
-                db.session.add(event)
-                db.session.commit()
-                # If successful, return to the homepage and use Flask Flash to display a success message
-                flash('Event added!', 'success')
-                return redirect(url_for('index'))
-            except SQLAlchemyError as e:
-                db.session.rollback()
-                flash(f'An error occured while saving.{e}', 'error')
-                return render_template('add_event.html', form=form)
-        else:
+        # The unique index on country, year and type rejects an event that already exists, so there is no need to
+        # check with a separate query first, and two people adding the same event at once can't both succeed
+        try:
+            db.session.add(event)
+            bump_table_version("event")
+            db.session.commit()
+            # If successful, return to the homepage and use Flask Flash to display a success message
+            flash('Event added!', 'success')
+            return redirect(url_for('index'))
+        except IntegrityError:
+            db.session.rollback()
             flash('This event already exists.', 'error')
-            render_template('add_event.html', form=form)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            flash(f'An error occured while saving.{e}', 'error')
 
     # Otherwise display the page with the Event template
     return render_template('add_event.html', form=form)
@@ -77,5 +94,18 @@ def add_event():
 @app.get('/chart')
 def display_chart():
     """ Returns a page with a line chart. """
-    line_fig_html = line_chart(feature="participants", db=db)
-    return render_template('chart.html', fig_html=line_fig_html)
+    # The figure is only made again when the event table changes
+    line_fig_html = cached_fragment("line_chart:participants", ("event",),
+                                    lambda: line_chart(feature="participants", db=db))
+    return render_template('chart.html', fig_html=line_fig_html, plotly_version=PLOTLY_JS_VERSION)
+
+
+@app.get('/plotly-<version>.min.js')
+def plotly_js(version):
+    """ Returns the plotly.js bundle installed with the plotly package, with headers to cache it for a year. """
+    # Old versions are not available, so a cached page never gets a different plotly.js to the one it asked for
+    if version != PLOTLY_JS_VERSION:
+        abort(404)
+    response = send_file(PLOTLY_JS_FILE, mimetype='text/javascript', max_age=PLOTLY_JS_MAX_AGE)
+    response.cache_control.immutable = True
+    return response
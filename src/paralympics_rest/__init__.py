@@ -41,7 +41,26 @@ def create_app(test_config=None):
         # Generate your own SECRET_KEY using python secrets
         SECRET_KEY='l-tirPCf1S44mWAGoWqWlA',
         # configure the SQLite database, relative to the app instance folder
-        SQLALCHEMY_DATABASE_URI="sqlite:///" + os.path.join(app.instance_path, 'paralympics_rest.sqlite')
+        SQLALCHEMY_DATABASE_URI="sqlite:///" + os.path.join(app.instance_path, 'paralympics_rest.sqlite'),
+        # Largest page size allowed for ?limit= on the collection routes
+        PAGE_SIZE_MAX=1000,
+        # Largest number of items allowed in a request to the :batch routes
+        BATCH_SIZE_MAX=1000,
+        # Number of rows fetched from the database at a time when streaming a response
+        STREAM_BATCH_SIZE=500,
+        # Number of seconds clients may reuse a GET response without checking its ETag with the server
+        CACHE_CONTROL_MAX_AGE=0,
+        # Number of verified tokens kept in memory and the number of seconds each is kept for
+        AUTH_TOKEN_CACHE_SIZE=1024,
+        AUTH_TOKEN_CACHE_TTL=60,
+        # If True, a token with a valid signature is accepted without checking the user is in the database
+        AUTH_TRUST_TOKEN_CLAIMS=False,
+        # Werkzeug password hash method and cost, e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'
+        PASSWORD_HASH_METHOD="scrypt",
+        PASSWORD_HASH_SALT_LENGTH=16,
+        # Number of threads or processes ('thread' or 'process') used for hashing, 0 hashes on the request thread
+        PASSWORD_HASH_WORKERS=0,
+        PASSWORD_HASH_EXECUTOR="thread",
     )
 
     if test_config is None:
@@ -73,6 +92,9 @@ def create_app(test_config=None):
     # create_all does not update tables if they are already in the database.
     with app.app_context():
         db.create_all()
+        # create_all() does not add new indexes to tables that already exist, so add any that are missing
+        for index in Event.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
 
         from paralympics_rest.utilities import add_data
         add_data(db)
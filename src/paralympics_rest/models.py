@@ -2,9 +2,8 @@ from sqlalchemy import ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import List
 
-from werkzeug.security import generate_password_hash, check_password_hash
-
 from paralympics_rest import db
+from paralympics_rest.passwords import hash_password, verify_password
 
 
 class Region(db.Model):
@@ -12,14 +11,17 @@ class Region(db.Model):
     NOC: Mapped[str] = mapped_column(db.Text, primary_key=True)
     region: Mapped[str] = mapped_column(db.Text, nullable=False)
     notes: Mapped[str] = mapped_column(db.Text, nullable=True)
+    # Relationships use the default lazy loading. Routes that dump the related objects choose a loader strategy,
+    # e.g. selectinload(), so that the related rows are not loaded one query at a time.
     events: Mapped[List["Event"]] = relationship(back_populates="region")
 
 
 class Event(db.Model):
     __tablename__ = "event"
     id: Mapped[int] = mapped_column(db.Integer, primary_key=True)
-    type: Mapped[str] = mapped_column(db.Text, nullable=False)
-    year: Mapped[int] = mapped_column(db.Integer, nullable=False)
+    # type and year are indexed as they are used to filter the events in GET /events
+    type: Mapped[str] = mapped_column(db.Text, nullable=False, index=True)
+    year: Mapped[int] = mapped_column(db.Integer, nullable=False, index=True)
     country: Mapped[str] = mapped_column(db.Text, nullable=False)
     host: Mapped[str] = mapped_column(db.Text, nullable=False)
     NOC: Mapped[str] = mapped_column(ForeignKey("region.NOC"))
@@ -46,7 +48,8 @@ class User(db.Model):
         return '<User {}>'.format(self.email)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        # The hash method, cost and optional hashing pool are set in the app config, see passwords.py
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
@@ -0,0 +1,50 @@
+"""Password hashing for the User model using the method set in the app config.
+
+Hashing is deliberately slow. To stop a burst of logins using all the CPU of a worker, hashing can be sent to a
+bounded thread or process pool by setting PASSWORD_HASH_WORKERS to more than 0. The request still waits for its hash,
+but no more than that number of hashes run at once, leaving the other threads free for the rest of the API.
+"""
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from flask import current_app as app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+def get_executor():
+    """Returns the pool used for hashing, or None if hashing runs on the request thread.
+
+    The pool is created the first time it is needed using PASSWORD_HASH_WORKERS and PASSWORD_HASH_EXECUTOR
+    ('thread' or 'process') from the app config.
+    """
+    workers = app.config.get("PASSWORD_HASH_WORKERS", 0)
+    if not workers:
+        return None
+    if "password_executor" not in app.extensions:
+        if app.config.get("PASSWORD_HASH_EXECUTOR", "thread") == "process":
+            executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        app.extensions["password_executor"] = executor
+    return app.extensions["password_executor"]
+
+
+def hash_password(password):
+    """Returns the hash of the password using PASSWORD_HASH_METHOD and PASSWORD_HASH_SALT_LENGTH.
+
+    The method is any method accepted by werkzeug.security.generate_password_hash, e.g. 'scrypt:32768:8:1' or
+    'pbkdf2:sha256:600000', where the numbers set the cost.
+    """
+    method = app.config.get("PASSWORD_HASH_METHOD", "scrypt")
+    salt_length = app.config.get("PASSWORD_HASH_SALT_LENGTH", 16)
+    executor = get_executor()
+    if executor is None:
+        return generate_password_hash(password, method=method, salt_length=salt_length)
+    return executor.submit(generate_password_hash, password, method, salt_length).result()
+
+
+def verify_password(password_hash, password):
+    """Returns True if the password matches the hash. The method and cost are read from the hash itself."""
+    executor = get_executor()
+    if executor is None:
+        return check_password_hash(password_hash, password)
+    return executor.submit(check_password_hash, password_hash, password).result()
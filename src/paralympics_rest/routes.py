@@ -1,13 +1,16 @@
 import datetime
 
-from flask import current_app as app, request, abort, jsonify, make_response
+from flask import current_app as app, request, abort, jsonify, make_response, stream_with_context
 from marshmallow.exceptions import ValidationError
-from sqlalchemy import exc
+from sqlalchemy import exc, inspect
+from sqlalchemy.orm import selectinload, joinedload
 
 from paralympics_rest import db
 from paralympics_rest.models import Region, Event, User
-from paralympics_rest.schemas import RegionSchema, EventSchema, UserSchema
-from paralympics_rest.utilities import token_required, encode_auth_token
+from paralympics_rest.schemas import RegionSchema, EventSchema, UserSchema, RegionExpandedSchema, \
+    EventExpandedSchema
+from paralympics_rest.utilities import token_required, encode_auth_token, get_fields, get_expand, get_int_arg, \
+    paginate, next_page_link, conditional_get, bump_table_version, get_token_cache
 
 # Flask-Marshmallow Schemas
 regions_schema = RegionSchema(many=True)
@@ -15,24 +18,121 @@ region_schema = RegionSchema()
 events_schema = EventSchema(many=True)
 event_schema = EventSchema()
 user_schema = UserSchema()
+# Used with ?expand=events and ?expand=region
+regions_expanded_schema = RegionExpandedSchema(many=True)
+region_expanded_schema = RegionExpandedSchema()
+events_expanded_schema = EventExpandedSchema(many=True)
+event_expanded_schema = EventExpandedSchema()
+
+
+def select_fields(model, fields, key):
+    """Creates a select for only the requested columns, or whole objects if fields is None.
+
+    The key column is always selected as it is needed to create the link to the next page.
+
+    Args:
+        model: SQLAlchemy model class
+        fields: list of column names from get_fields(), or None for all columns
+        key: name of the primary key column
+
+    Returns:
+        SQLAlchemy select statement
+    """
+    if fields is not None and request.args.get("expand"):
+        abort(400, description="fields and expand cannot be used together")
+    if fields is None:
+        return db.select(model)
+    names = fields if key in fields else fields + [key]
+    return db.select(*[getattr(model, name) for name in names])
+
+
+def dump_rows(rows, schema_class, schema, fields):
+    """Dumps the rows returned by a select_fields() query to JSON.
+
+    Args:
+        rows: result rows from the query
+        schema_class: Marshmallow schema class, used to create a schema with only the requested fields
+        schema: Marshmallow schema used for whole objects
+        fields: list of column names, or None if whole objects were selected
+
+    Returns:
+        JSON list
+    """
+    if fields is None:
+        return schema.dump([row[0] for row in rows])
+    return schema_class(many=True, only=fields).dump([row._asdict() for row in rows])
+
+
+def wants_stream():
+    """Returns True if the client asked for newline delimited JSON with ?stream=1 or the Accept header."""
+    if request.args.get("stream") == "1":
+        return True
+    return request.accept_mimetypes.best_match(["application/json", "application/x-ndjson"]) == "application/x-ndjson"
+
+
+def stream_rows(query, schema_class, schema, fields):
+    """Streams the results of a select_fields() query as newline delimited JSON, one object per line.
+
+    The rows are fetched from the database in batches of STREAM_BATCH_SIZE and each row is dumped and sent as it is
+    read, so the memory used does not grow with the number of rows.
+
+    Args:
+        query: SQLAlchemy select statement
+        schema_class: Marshmallow schema class, used to create a schema with only the requested fields
+        schema: Marshmallow schema for a single whole object
+        fields: list of column names, or None if whole objects were selected
+
+    Returns:
+        A chunked HTTP response with the application/x-ndjson mimetype
+    """
+    row_schema = schema if fields is None else schema_class(only=fields)
+    batch_size = app.config.get("STREAM_BATCH_SIZE", 500)
+
+    def generate():
+        rows = db.session.execute(query.execution_options(yield_per=batch_size))
+        for row in rows:
+            item = row[0] if fields is None else row._asdict()
+            yield app.json.dumps(row_schema.dump(item)) + "\n"
+
+    return app.response_class(stream_with_context(generate()), mimetype="application/x-ndjson")
 
 
 # REGION ROUTES
 @app.get("/regions")
+@conditional_get("region", "event")
 def get_regions():
     """Returns a list of NOC region codes and their details in JSON.
 
+    Optional query parameters:
+        fields: comma separated list of the fields to return, e.g. ?fields=NOC,region
+        limit: maximum number of regions to return
+        after_id: only return regions with a NOC code after this one, use the NOC of the last region of the
+            previous page. A Link header with the URL of the next page is added when the page is full.
+        expand: events, to include the list of events for each region
+
     Returns:
         JSON for all the regions, or 500 error if not found
     """
+    fields = get_fields(Region)
+    query = select_fields(Region, fields, "NOC")
+    schema = regions_schema
+    if "events" in get_expand(["events"]):
+        # Load the events for all the regions in one extra query rather than one query per region
+        query = query.options(selectinload(Region.events))
+        schema = regions_expanded_schema
+    query, limit = paginate(query, Region.NOC)
     try:
-        # Select all the regions using Flask-SQLAlchemy
-        all_regions = db.session.execute(db.select(Region)).scalars()
+        # Select the regions using Flask-SQLAlchemy
+        rows = db.session.execute(query).all()
         # Dump the data using the Marshmallow regions schema; '.dump()' returns JSON.
         try:
-            result = regions_schema.dump(all_regions)
+            result = dump_rows(rows, RegionSchema, schema, fields)
             # If all OK then return the data in the HTTP response
-            return result
+            response = make_response(result)
+            if limit is not None and len(rows) == limit:
+                last_region = rows[-1][0] if fields is None else rows[-1]
+                response.headers["Link"] = next_page_link(last_region.NOC, limit)
+            return response
         except ValidationError as e:
             app.logger.error(f"A Marshmallow ValidationError occurred dumping all regions: {str(e)}")
             msg = {'message': "An Internal Server Error occurred."}
@@ -44,23 +144,32 @@ def get_regions():
 
 
 @app.get('/regions/<code>')
+@conditional_get("region", "event")
 def get_region(code):
     """ Returns one region in JSON.
 
     Returns 404 if the region code is not found in the database.
 
+    Optional query parameters:
+        expand: events, to include the list of events for the region
+
     Args:
         code (str): The 3 digit NOC code of the region to be searched for
 
     Returns: 
         JSON for the region if found otherwise 404
     """
+    query = db.select(Region).filter_by(NOC=code)
+    schema = region_schema
+    if "events" in get_expand(["events"]):
+        query = query.options(selectinload(Region.events))
+        schema = region_expanded_schema
     # Query structure shown at https://flask-sqlalchemy.palletsprojects.com/en/3.1.x/queries/#select
     # Try to find the region, if it is ot found, catch the error and return 404
     try:
-        region = db.session.execute(db.select(Region).filter_by(NOC=code)).scalar_one()
+        region = db.session.execute(query).scalar_one()
         # Dump the data using the Marshmallow region schema; '.dump()' returns JSON.
-        result = region_schema.dump(region)
+        result = schema.dump(region)
         # Return the data in the HTTP response
         return result
     except exc.NoResultFound as e:
@@ -86,6 +195,7 @@ def add_region():
 
         try:
             db.session.add(region)
+            bump_table_version("region")
             db.session.commit()
             return {"message": f"Region added with NOC= {region.NOC}"}
         except exc.SQLAlchemyError as e:
@@ -111,6 +221,7 @@ def delete_region(noc_code):
     try:
         region = db.session.execute(db.select(Region).filter_by(NOC=noc_code)).scalar_one()
         db.session.delete(region)
+        bump_table_version("region")
         db.session.commit()
         return {"message": f"Region {noc_code} deleted."}
     except exc.SQLAlchemyError as e:
@@ -160,6 +271,7 @@ def update_region(noc_code):
     # Commit the changes to the database
     try:
         db.session.add(region_update)
+        bump_table_version("region")
         db.session.commit()
         # Return json message
         response = {"message": f"Region {noc_code} updated."}
@@ -172,28 +284,79 @@ def update_region(noc_code):
 
 # EVENT ROUTES
 @app.get("/events")
+@conditional_get("event", "region")
 def get_events():
     """Returns a list of events and their details in JSON.
 
+    Optional query parameters:
+        fields: comma separated list of the fields to return, e.g. ?fields=id,year,host
+        type: only return events of this type, summer or winter
+        year_from: only return events in or after this year
+        year_to: only return events in or before this year
+        limit: maximum number of events to return
+        after_id: only return events with an id greater than this, use the id of the last event of the previous
+            page. A Link header with the URL of the next page is added when the page is full.
+        expand: region, to include the region details in place of the region code
+        stream: 1, to stream the events as newline delimited JSON, also used if the Accept header prefers
+            application/x-ndjson. The Link header is not added when streaming.
+
     Returns:
         JSON for all events
     """
-    all_events = db.session.execute(db.select(Event)).scalars()
-    result = events_schema.dump(all_events)
-    return result
+    fields = get_fields(Event)
+    query = select_fields(Event, fields, "id")
+    schema = events_schema
+    item_schema = event_schema
+    if "region" in get_expand(["region"]):
+        schema = events_expanded_schema
+        item_schema = event_expanded_schema
+    if fields is None:
+        # The schema dumps the region of each event, so load the regions in one extra query rather than one each
+        query = query.options(selectinload(Event.region))
+    # Filters use the indexes on the type and year columns
+    event_type = request.args.get("type")
+    if event_type:
+        query = query.where(Event.type == event_type)
+    year_from = get_int_arg("year_from")
+    if year_from is not None:
+        query = query.where(Event.year >= year_from)
+    year_to = get_int_arg("year_to")
+    if year_to is not None:
+        query = query.where(Event.year <= year_to)
+    query, limit = paginate(query, Event.id)
+
+    if wants_stream():
+        return stream_rows(query, EventSchema, item_schema, fields)
+
+    rows = db.session.execute(query).all()
+    result = dump_rows(rows, EventSchema, schema, fields)
+    response = make_response(result)
+    if limit is not None and len(rows) == limit:
+        last_event = rows[-1][0] if fields is None else rows[-1]
+        response.headers["Link"] = next_page_link(last_event.id, limit)
+    return response
 
 
 @app.get('/events/<event_id>')
+@conditional_get("event", "region")
 def get_event(event_id):
     """ Returns the event with the given id JSON.
 
+    Optional query parameters:
+        expand: region, to include the region details in place of the region code
+
     Args:
         event_id (int): The id of the event to return
     Returns:
         JSON
     """
-    event = db.session.execute(db.select(Event).filter_by(id=event_id)).scalar_one()
-    result = event_schema.dump(event)
+    schema = event_schema
+    if "region" in get_expand(["region"]):
+        schema = event_expanded_schema
+    # A single event, so join the region in the same query
+    query = db.select(Event).filter_by(id=event_id).options(joinedload(Event.region))
+    event = db.session.execute(query).scalar_one()
+    result = schema.dump(event)
     return result
 
 
@@ -210,6 +373,7 @@ def add_event():
     ev_json = request.get_json()
     event = event_schema.load(ev_json)
     db.session.add(event)
+    bump_table_version("event")
     db.session.commit()
     return {"message": f"Event added with id= {event.id}"}
 
@@ -225,6 +389,7 @@ def delete_event(event_id):
     """
     event = db.session.execute(db.select(Event).filter_by(id=event_id)).scalar_one()
     db.session.delete(event)
+    bump_table_version("event")
     db.session.commit()
     return {"message": f"Event {event_id} deleted."}
 
@@ -246,12 +411,249 @@ def event_update(event_id):
     event_updated = event_schema.load(event_json, instance=existing_event, partial=True)
     # Commit the changes to the database
     db.session.add(event_updated)
+    bump_table_version("event")
     db.session.commit()
     # Return json success message
     response = {"message": f"Event with id={event_id} updated."}
     return response
 
 
+# BATCH ROUTES
+# Each batch is validated as a whole and written in a single transaction, so either every item is saved or none are.
+def get_batch_json():
+    """Gets the list of items from the request body, aborts with 400 if it is not a list or is too long."""
+    items = request.get_json()
+    if not isinstance(items, list):
+        abort(400, description="The request body must be a JSON list")
+    max_size = app.config.get("BATCH_SIZE_MAX", 1000)
+    if len(items) > max_size:
+        abort(400, description=f"A batch can contain no more than {max_size} items")
+    return items
+
+
+def commit_batch(table):
+    """Increases the table version and commits it with the batch in the session, in one transaction.
+
+    Returns:
+        None if the commit succeeded, otherwise an error response
+    """
+    try:
+        bump_table_version(table)
+        db.session.commit()
+        return None
+    except exc.IntegrityError as e:
+        db.session.rollback()
+        app.logger.error(f"An integrity error occurred saving the {table} batch: {str(e)}")
+        msg = {'message': "The batch conflicts with existing data. No changes were saved."}
+        return make_response(msg, 409)
+    except exc.SQLAlchemyError as e:
+        db.session.rollback()
+        app.logger.error(f"An error occurred saving the {table} batch: {str(e)}")
+        msg = {'message': "An Internal Server Error occurred. No changes were saved."}
+        return make_response(msg, 500)
+
+
+def get_key_errors(model, key, keys):
+    """Checks each primary key in a batch is a single value of the primary key's type, e.g. an int for an event id.
+
+    Args:
+        model: SQLAlchemy model class
+        key: name of the primary key
+        keys: list of the primary keys from the request, one for each item
+
+    Returns:
+        dict of the index of each invalid key to its error messages, empty if all the keys are valid
+    """
+    key_type = getattr(model, key).type.python_type
+    errors = {}
+    for index, value in enumerate(keys):
+        # bool is a subclass of int, but true and false are not ids
+        if not isinstance(value, key_type) or isinstance(value, bool):
+            errors[index] = {key: [f"Must be a single {key_type.__name__} value, not {value!r}"]}
+    return errors
+
+
+def batch_create(schema, key, table):
+    """Validates a list of new objects with a many=True schema and adds them in one transaction.
+
+    An item with the primary key of an existing object is an error, use the PATCH batch route to update objects.
+
+    Args:
+        schema: Marshmallow schema with many=True
+        key: name of the primary key, returned for each created object
+        table: name of the table, used to increase the table version
+
+    Returns:
+        JSON with the result for each item, 400 with the validation errors for each invalid item, or 409 with the
+        errors for each item whose primary key is already in the database
+    """
+    items = get_batch_json()
+    try:
+        objects = schema.load(items)
+    except ValidationError as e:
+        app.logger.error(f"A Marshmallow ValidationError loading the {table} batch: {str(e)}")
+        msg = {'message': "The batch failed validation. No changes were saved.", 'errors': e.messages}
+        return make_response(msg, 400)
+    # The schema loads an item with the primary key of an existing object into that object, so it would be updated
+    errors = {index: {key: [f"{key}={inspect(obj).identity[0]} already exists in {table}"]}
+              for index, obj in enumerate(objects) if inspect(obj).persistent}
+    if errors:
+        db.session.rollback()
+        msg = {'message': "The batch conflicts with existing data. No changes were saved.", 'errors': errors}
+        return make_response(msg, 409)
+    db.session.add_all(objects)
+    error_response = commit_batch(table)
+    if error_response:
+        return error_response
+    # The identity holds the primary key, reading it does not reload the objects expired by the commit
+    results = [{"index": index, key: inspect(obj).identity[0], "status": "created"}
+               for index, obj in enumerate(objects)]
+    return make_response({"results": results}, 201)
+
+
+def batch_update(model, schema, key, table):
+    """Updates a list of objects, each identified by its primary key, in one transaction.
+
+    The existing objects are selected with one query rather than one query per item.
+
+    Args:
+        model: SQLAlchemy model class
+        schema: Marshmallow schema for a single object
+        key: name of the primary key, must be in each item
+        table: name of the table, used to increase the table version
+
+    Returns:
+        JSON with the result for each item, or 400 with the errors for each item that could not be updated
+    """
+    items = get_batch_json()
+    keys = [item.get(key) if isinstance(item, dict) else None for item in items]
+    errors = get_key_errors(model, key, keys)
+    valid_keys = [value for index, value in enumerate(keys) if index not in errors]
+    existing = db.session.execute(db.select(model).where(getattr(model, key).in_(valid_keys))).scalars()
+    objects = {getattr(obj, key): obj for obj in existing}
+
+    for index, item in enumerate(items):
+        if index in errors:
+            continue
+        if keys[index] not in objects:
+            errors[index] = {key: [f"No {table} found with {key}={keys[index]}"]}
+            continue
+        try:
+            schema.load(item, instance=objects[keys[index]], partial=True)
+        except ValidationError as e:
+            errors[index] = e.messages
+    if errors:
+        db.session.rollback()
+        msg = {'message': "The batch failed validation. No changes were saved.", 'errors': errors}
+        return make_response(msg, 400)
+
+    error_response = commit_batch(table)
+    if error_response:
+        return error_response
+    results = [{"index": index, key: keys[index], "status": "updated"} for index in range(len(items))]
+    return {"results": results}
+
+
+def batch_delete(model, key, table, referenced_by=None):
+    """Deletes the objects with the primary keys in the request body list using a single DELETE statement.
+
+    The DELETE statement does not go through the ORM, so objects that other rows still refer to are checked for first
+    and the batch is refused, the same as deleting one of them on its own.
+
+    Args:
+        model: SQLAlchemy model class
+        key: name of the primary key
+        table: name of the table, used to increase the table version
+        referenced_by: optional foreign key column of another model that refers to the primary key, e.g. Event.NOC
+
+    Returns:
+        JSON with the result for each key, either deleted or not found, 400 with the errors for each invalid key, or
+        409 with the errors for each key that other rows still refer to
+    """
+    keys = get_batch_json()
+    errors = get_key_errors(model, key, keys)
+    if errors:
+        msg = {'message': "The batch failed validation. No changes were saved.", 'errors': errors}
+        return make_response(msg, 400)
+    if referenced_by is not None:
+        referenced = set(db.session.execute(db.select(referenced_by).where(referenced_by.in_(keys)).distinct()).scalars())
+        errors = {index: {key: [f"{value} is still used by {referenced_by.class_.__tablename__} rows"]}
+                  for index, value in enumerate(keys) if value in referenced}
+        if errors:
+            msg = {'message': "The batch conflicts with existing data. No changes were saved.", 'errors': errors}
+            return make_response(msg, 409)
+    key_column = getattr(model, key)
+    result = db.session.execute(db.delete(model).where(key_column.in_(keys)).returning(key_column))
+    deleted = set(result.scalars())
+    error_response = commit_batch(table)
+    if error_response:
+        return error_response
+    results = [{"index": index, key: value, "status": "deleted" if value in deleted else "not found"}
+               for index, value in enumerate(keys)]
+    return {"results": results}
+
+
+@app.post("/regions:batch")
+def add_regions():
+    """Adds a list of new regions in one transaction.
+
+    Returns:
+        JSON list with the NOC of each region added, or 400 with the errors for each invalid region
+    """
+    return batch_create(regions_schema, "NOC", "region")
+
+
+@app.patch("/regions:batch")
+@token_required
+def update_regions():
+    """Updates changed fields for a list of regions, each item must include the NOC of the region to update.
+
+    Returns:
+        JSON list with the result for each region, or 400 with the errors for each region that was not updated
+    """
+    return batch_update(Region, region_schema, "NOC", "region")
+
+
+@app.delete("/regions:batch")
+def delete_regions():
+    """Deletes the regions with the NOC codes in the request body list.
+
+    Returns:
+        JSON list with the result for each NOC code
+    """
+    return batch_delete(Region, "NOC", "region", referenced_by=Event.NOC)
+
+
+@app.post("/events:batch")
+def add_events():
+    """Adds a list of new events in one transaction.
+
+    Returns:
+        JSON list with the id of each event added, or 400 with the errors for each invalid event
+    """
+    return batch_create(events_schema, "id", "event")
+
+
+@app.patch("/events:batch")
+def update_events():
+    """Updates changed fields for a list of events, each item must include the id of the event to update.
+
+    Returns:
+        JSON list with the result for each event, or 400 with the errors for each event that was not updated
+    """
+    return batch_update(Event, event_schema, "id", "event")
+
+
+@app.delete("/events:batch")
+def delete_events():
+    """Deletes the events with the ids in the request body list.
+
+    Returns:
+        JSON list with the result for each id
+    """
+    return batch_delete(Event, "id", "event")
+
+
 # AUTHENTICATION ROUTES
 @app.post("/register")
 def register():
@@ -326,3 +728,9 @@ def login():
 
     # Return the token and the user_id of the logged in user
     return make_response(jsonify({"user_id": user.id, "token": token}), 201)
+
+
+@app.get('/auth/stats')
+def auth_stats():
+    """Returns the token cache hit rate and average authentication time in JSON."""
+    return get_token_cache().stats()
@@ -47,3 +47,18 @@ class UserSchema(ma.SQLAlchemySchema):
 
     email = ma.auto_field()
     password_hash = ma.auto_field()
+
+
+class EventExpandedSchema(EventSchema):
+    """Event schema with the full region details nested in place of the region code, used for ?expand=region."""
+
+    region = ma.Nested(RegionSchema, dump_only=True)
+
+
+class RegionExpandedSchema(RegionSchema):
+    """Region schema with a nested list of the region's events, used for ?expand=events.
+
+    The region is excluded from each nested event as it is the region that contains the event.
+    """
+
+    events = ma.Nested(EventSchema, many=True, exclude=("region",), dump_only=True)
@@ -1,43 +1,181 @@
 import datetime
+import hashlib
+import threading
+import time
+import zlib
+from collections import OrderedDict
 from functools import wraps
-from pathlib import Path
 
 import jwt
-import pandas as pd
-from flask import request, make_response, current_app as app
+from flask import request, make_response, abort, url_for, current_app as app
 
+from paralympics_data.loader import load_data
+from paralympics_data.versions import bump_table_versions, get_table_versions
 from paralympics_rest import db
-from paralympics_rest.models import User, Region, Event
+from paralympics_rest.models import User
+
+
+class TokenCache:
+    """Bounded cache of verified tokens and the id of the user each token belongs to.
+
+    An entry is kept for no longer than the ttl and never after the token expires. The key includes a hash of the
+    SECRET_KEY, so changing the key means tokens signed with the old key are no longer found in the cache.
+
+    User ids are stored as int, the same type as User.id, although the token holds the id as a string.
+
+    Args:
+        maxsize: Maximum number of tokens to keep, the least recently used token is removed when this is exceeded
+        ttl: Maximum number of seconds to keep a token for
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.auth_count = 0
+        self.auth_seconds = 0.0
+
+    @staticmethod
+    def _key(token):
+        secret = app.config.get("SECRET_KEY", "")
+        return hashlib.sha256(secret.encode()).hexdigest(), token
+
+    def get(self, token):
+        """Returns the user id for the token, or None if the token is not in the cache or has expired."""
+        key = self._key(token)
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is not None and entry[1] > time.time():
+                self._tokens.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._tokens[key]
+            self.misses += 1
+            return None
+
+    def add(self, token, user_id, expires):
+        """Adds a verified token.
+
+        Args:
+            token: the encoded token
+            user_id: the id of the user in the token, as an int
+            expires: the token expiry time ('exp' claim) as a timestamp
+        """
+        key = self._key(token)
+        with self._lock:
+            self._tokens[key] = (user_id, min(expires, time.time() + self.ttl))
+            self._tokens.move_to_end(key)
+            while len(self._tokens) > self.maxsize:
+                self._tokens.popitem(last=False)
+
+    def invalidate_user(self, user_id):
+        """Removes all the tokens for a user.
+
+        The API has no route that deletes users yet. One that does should call this after the user is deleted, so that
+        tokens already in the cache are not accepted for up to AUTH_TOKEN_CACHE_TTL seconds.
+
+        Args:
+            user_id: id of the user, e.g. User.id
+        """
+        user_id = int(user_id)
+        with self._lock:
+            for key in [key for key, entry in self._tokens.items() if entry[0] == user_id]:
+                del self._tokens[key]
+
+    def clear(self):
+        """Removes all the tokens, e.g. after the SECRET_KEY is changed."""
+        with self._lock:
+            self._tokens.clear()
+
+    def record_auth_time(self, seconds):
+        """Adds the time taken to authenticate a request to the metrics."""
+        with self._lock:
+            self.auth_count += 1
+            self.auth_seconds += seconds
+
+    def stats(self):
+        """Returns the cache hit rate and average authentication time as a dictionary."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._tokens),
+                "auth_count": self.auth_count,
+                "auth_mean_ms": 1000 * self.auth_seconds / self.auth_count if self.auth_count else 0.0,
+            }
+
+
+def get_token_cache():
+    """Returns the token cache for the app, creating it with the sizes in the app config the first time."""
+    if "token_cache" not in app.extensions:
+        app.extensions["token_cache"] = TokenCache(maxsize=app.config.get("AUTH_TOKEN_CACHE_SIZE", 1024),
+                                                   ttl=app.config.get("AUTH_TOKEN_CACHE_TTL", 60))
+    return app.extensions["token_cache"]
 
 
 def token_required(f):
     """Require valid jwt for a route
 
     Decorator to protect routes using jwt
+
+    Tokens that have already been verified are found in the token cache, so they are not decoded or checked against
+    the database again until the cache entry expires. If AUTH_TRUST_TOKEN_CLAIMS is True, a token with a valid
+    signature is accepted without checking that the user is still in the database.
     """
 
     @wraps(f)
     def decorator(*args, **kwargs):
-        token = None
-        # See if there is an Authorization section in the HTTP request headers
-        if "Authorization" in request.headers:
-            token = request.headers.get("Authorization")
-
-        # If not, then return a 401 error (missing or invalid authentication credentials)
-        if not token:
-            response = {"message": "Authentication Token missing"}
-            return make_response(response, 401)
-        # Check the token is valid
-        token_payload = decode_auth_token(token)
-        user_id = token_payload["sub"]
-        # Find the user in the database using their email address which is in the data of the decoded token
+        start = time.perf_counter()
+        response = authenticate()
+        token_cache = get_token_cache()
+        token_cache.record_auth_time(time.perf_counter() - start)
+        if response is not None:
+            return response
+        return f(*args, **kwargs)
+
+    return decorator
+
+
+def authenticate():
+    """Checks the token in the Authorization header of the request.
+
+    :return: None if the token is valid, otherwise a 401 response
+    """
+    token = None
+    # See if there is an Authorization section in the HTTP request headers
+    if "Authorization" in request.headers:
+        token = request.headers.get("Authorization")
+
+    # If not, then return a 401 error (missing or invalid authentication credentials)
+    if not token:
+        response = {"message": "Authentication Token missing"}
+        return make_response(response, 401)
+
+    # A token in the cache has already been verified
+    token_cache = get_token_cache()
+    if token_cache.get(token) is not None:
+        return None
+
+    # Check the token is valid, decode_auth_token returns a 401 response if it is not
+    token_payload = decode_auth_token(token)
+    if not isinstance(token_payload, dict):
+        return token_payload
+    # The subject is a string in the token, see encode_auth_token()
+    user_id = int(token_payload["sub"])
+    if not app.config.get("AUTH_TRUST_TOKEN_CLAIMS", False):
+        # Find the user in the database using the user id which is in the data of the decoded token
         current_user = db.session.execute(db.select(User).filter_by(id=user_id)).scalar_one_or_none()
         if not current_user:
             response = {"message": "Invalid or missing token."}
             return make_response(response, 401)
-        return f(*args, **kwargs)
-
-    return decorator
+    token_cache.add(token, user_id, token_payload["exp"])
+    return None
 
 
 def encode_auth_token(user_id):
@@ -53,7 +191,8 @@ def encode_auth_token(user_id):
             payload={
                 "exp": datetime.datetime.now(datetime.UTC) + datetime.timedelta(minutes=5),
                 "iat": datetime.datetime.now(datetime.UTC),
-                "sub": user_id,
+                # The JWT spec requires the subject to be a string, PyJWT rejects tokens with an integer 'sub'
+                "sub": str(user_id),
             },
             # Flask app secret key, matches the key used in the decode() in the decorator
             key=app.config['SECRET_KEY'],
@@ -82,36 +221,156 @@ def decode_auth_token(auth_token):
         return make_response({'message': "Invalid token. Please log in again."}, 401)
 
 
+def bump_table_version(*tables):
+    """Increases the version of each table, call before committing a change to the table.
+
+    The versions are stored in the database so that every worker process sees the change, see paralympics_data.versions.
+    The new versions are saved by the same commit as the change, so a client can't get a 304 for data that has changed.
+
+    :param tables: names of the tables that were changed, e.g. "event"
+    """
+    bump_table_versions(db.session, db.metadata, tables)
+
+
+def conditional_get(*tables):
+    """Adds ETag and Cache-Control headers to a GET route and returns 304 Not Modified when the ETag matches.
+
+    The ETag is made from the versions of the tables the route reads and the request URL, so checking if a client
+    has the current data only needs the versions to be read, not the data.
+
+    :param tables: names of the tables that the route reads from
+    """
+
+    def wrapper(f):
+        @wraps(f)
+        def decorator(*args, **kwargs):
+            versions = "-".join(str(version) for version in get_table_versions(db, tables))
+            # The Accept header is included as some routes return a different format depending on it
+            url_hash = zlib.crc32(f"{request.full_path} {request.headers.get('Accept', '')}".encode())
+            etag = f"{versions}-{url_hash:08x}"
+
+            if request.if_none_match.contains(etag):
+                response = make_response("", 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.vary.add("Accept")
+            response.cache_control.public = True
+            response.cache_control.max_age = app.config.get("CACHE_CONTROL_MAX_AGE", 0)
+            return response
+
+        return decorator
+
+    return wrapper
+
+
+def get_fields(model):
+    """Gets the list of fields requested with the ?fields= query parameter, e.g. ?fields=id,year,host
+
+    Aborts with 400 if any of the fields are not columns of the model.
+
+    :param model: SQLAlchemy model class the fields are selected from
+    :return: list of field names, or None if all fields are requested
+    """
+    fields = request.args.get("fields")
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    columns = model.__table__.columns.keys()
+    invalid = [name for name in names if name not in columns]
+    if invalid:
+        abort(400, description=f"Invalid field(s): {', '.join(invalid)}. Must be in {columns}")
+    return names
+
+
+def get_expand(allowed):
+    """Gets the list of relationships requested with the ?expand= query parameter, e.g. ?expand=region
+
+    Aborts with 400 if a relationship is not allowed for the route.
+
+    :param allowed: list of the relationship names that the route can expand
+    :return: list of relationship names, empty if none were requested
+    """
+    expand = request.args.get("expand")
+    if not expand:
+        return []
+    names = [name.strip() for name in expand.split(",") if name.strip()]
+    invalid = [name for name in names if name not in allowed]
+    if invalid:
+        abort(400, description=f"Invalid expand value(s): {', '.join(invalid)}. Must be in {allowed}")
+    return names
+
+
+def get_int_arg(name, minimum=None):
+    """Gets an integer query parameter, aborts with 400 if it is not a valid integer.
+
+    :param name: name of the query parameter
+    :param minimum: the lowest value allowed, or None for no minimum
+    :return: int value or None if the parameter is not in the request
+    """
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        abort(400, description=f"{name} must be an integer")
+    if minimum is not None and value < minimum:
+        abort(400, description=f"{name} must be at least {minimum}")
+    return value
+
+
+def paginate(query, key_column, cursor_arg="after_id"):
+    """Applies keyset pagination to a select using ?limit= and ?after_id= query parameters.
+
+    Rows are ordered by the key column and only rows after the key value in ?after_id= are returned, so the
+    database can use the primary key index to find the page instead of skipping rows with OFFSET.
+
+    :param query: SQLAlchemy select statement
+    :param key_column: unique column to order and page by, e.g. Event.id
+    :param cursor_arg: name of the query parameter with the last key value of the previous page
+    :return: tuple of the paginated select statement and the limit (None if no limit was requested)
+    """
+    limit = get_int_arg("limit", minimum=1)
+    max_limit = app.config.get("PAGE_SIZE_MAX", 1000)
+    if limit is not None and limit > max_limit:
+        abort(400, description=f"limit must be no more than {max_limit}")
+    after = request.args.get(cursor_arg)
+    if after is not None:
+        if isinstance(key_column.type, db.Integer):
+            after = get_int_arg(cursor_arg)
+        query = query.where(key_column > after)
+    query = query.order_by(key_column)
+    if limit is not None:
+        query = query.limit(limit)
+    return query, limit
+
+
+def next_page_link(last_key, limit, cursor_arg="after_id"):
+    """Creates the value for a HTTP Link header pointing to the next page of results.
+
+    :param last_key: key of the last row in the current page
+    :param limit: number of rows in a page
+    :param cursor_arg: name of the query parameter for the key
+    :return: Link header value
+    """
+    args = request.args.to_dict()
+    args[cursor_arg] = last_key
+    args["limit"] = limit
+    url = url_for(request.endpoint, _external=True, **request.view_args, **args)
+    return f'<{url}>; rel="next"'
+
+
 def add_data(db):
     """Adds data to the database if it does not already exist.
 
+    The CSV files are only read if they have changed since they were last loaded, see paralympics_data.loader.
+
     :param db: SQLAlchemy database for the app
     """
-    # Create a connection to the REST API sqlite database usinf FlaskSQLAlchemy
-    connection = db.engine.connect()
-
-    # If there are no regions in the database, then add them
-    first_region = db.session.execute(db.select(Region)).first()
-    if not first_region:
-        print("Start adding region data to the database")
-        region_file = Path(__file__).parent.parent.parent.joinpath("data", "noc_regions.csv")
-        # Read the noc_regions data to a pandas dataframe
-        na_values = [""]
-        regions_df = pd.read_csv(region_file, keep_default_na=False, na_values=na_values)
-        # Write the values to the database table
-        regions_df.to_sql("region", connection, if_exists="append", index=False)
-
-    # If there are no Events, then add them
-    first_event = db.session.execute(db.select(Event)).first()
-    if not first_event:
-        # Read the paralympics event data to a pandas dataframe
-        event_file = Path(__file__).parent.parent.parent.joinpath("data", "paralympic_events.csv")
-        events_df = pd.read_csv(event_file)
-
-        # Write the pandas DataFrame contents to the database tables
-        # For the event table we want the pandas index, but it needs to start from 1 and not 0
-        events_df.index += 1
-        events_df.to_sql("event", connection, if_exists="append", index_label='id')
-
-    # Close the database connection
-    connection.close()
+    loaded = load_data(db)
+    if loaded:
+        print(f"Added data to the database: {loaded}")
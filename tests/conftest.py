@@ -0,0 +1,87 @@
+import shutil
+from contextlib import contextmanager
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+from paralympics_data import loader
+from paralympics_rest import create_app, db
+
+
+@contextmanager
+def record_queries(engine):
+    """Records the SQL statements executed by the engine inside the with block.
+
+    Args:
+        engine: SQLAlchemy engine, e.g. db.engine
+
+    Returns:
+        list that the SQL statements are added to
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture(scope="session")
+def rest_app(tmp_path_factory):
+    """Creates the paralympics REST app with the data loaded into a temporary database.
+
+    The routes are registered with the first app that is created, so one app is shared by all the tests.
+    """
+    db_file = tmp_path_factory.mktemp("paralympics_rest").joinpath("paralympics_rest.sqlite")
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_file}"})
+    yield app
+
+
+@pytest.fixture()
+def rest_client(rest_app):
+    """Test client for the paralympics REST app."""
+    return rest_app.test_client()
+
+
+@pytest.fixture()
+def rest_engine(rest_app):
+    """SQLAlchemy engine of the paralympics REST app database."""
+    with rest_app.app_context():
+        yield db.engine
+
+
+@pytest.fixture()
+def count_queries(rest_engine):
+    """Returns a function that records the SQL statements the REST app executes inside a with block, e.g.
+
+        with count_queries() as statements:
+            rest_client.get("/events")
+        assert len(statements) == 3
+    """
+    return lambda: record_queries(rest_engine)
+
+
+@pytest.fixture()
+def loader_app(tmp_path, monkeypatch):
+    """Creates an app with empty paralympics tables and copies of the CSV files that the test can change.
+
+    The app is not created with create_app(), so the data is only loaded when the test calls load_data().
+    """
+    sources = {}
+    for table_name, source in loader.CSV_SOURCES.items():
+        csv_file = tmp_path.joinpath(source["file"].name)
+        shutil.copy(source["file"], csv_file)
+        sources[table_name] = dict(source, file=csv_file)
+    monkeypatch.setattr(loader, "CSV_SOURCES", sources)
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path.joinpath('loader.sqlite')}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
@@ -0,0 +1,156 @@
+import pytest
+
+from paralympics_data import loader
+from paralympics_data.loader import load_data
+from paralympics_rest import db
+from paralympics_rest.models import Event
+
+
+# Each route reads the table versions for its ETag, then selects the main rows and the related rows with one query
+# each rather than one query per row
+@pytest.mark.parametrize("url", ["/events", "/events?expand=region", "/regions?expand=events"])
+def test_collection_query_count(rest_client, count_queries, url):
+    """
+    GIVEN the paralympics REST app with the data loaded
+    WHEN a collection route is requested
+    THEN the response is 200 and the route makes 3 queries however many rows are returned
+    """
+    with count_queries() as statements:
+        response = rest_client.get(url)
+    assert response.status_code == 200
+    assert len(statements) == 3
+
+
+@pytest.mark.parametrize("url", ["/events", "/events?expand=region", "/regions?expand=events"])
+def test_not_modified_query_count(rest_client, count_queries, url):
+    """
+    GIVEN a collection route that has already been requested
+    WHEN it is requested again with the ETag of the response
+    THEN the response is 304 Not Modified and only the table versions are read
+    """
+    etag = rest_client.get(url).headers["ETag"]
+    with count_queries() as statements:
+        response = rest_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert len(statements) == 1
+
+
+def test_batch_create_is_all_or_nothing(rest_client):
+    """
+    GIVEN a batch of new regions where the second region is missing a required field
+    WHEN the batch is posted to /regions:batch
+    THEN the response is 400 with the errors for the second region only and the first region is not saved
+    """
+    regions = [{"NOC": "ZZA", "region": "Batch A"}, {"NOC": "ZZB"}]
+    response = rest_client.post("/regions:batch", json=regions)
+    assert response.status_code == 400
+    assert list(response.json["errors"]) == ["1"]
+    assert rest_client.get("/regions/ZZA").status_code == 404
+
+
+def test_batch_create_and_delete(rest_client):
+    """
+    GIVEN a batch of new regions
+    WHEN the batch is posted to /regions:batch and the NOC codes are then deleted with /regions:batch
+    THEN each region is created, then deleted, and a code that is not in the database is reported as not found
+    """
+    regions = [{"NOC": "ZZC", "region": "Batch C"}, {"NOC": "ZZD", "region": "Batch D"}]
+    response = rest_client.post("/regions:batch", json=regions)
+    assert response.status_code == 201
+    assert [result["status"] for result in response.json["results"]] == ["created", "created"]
+
+    response = rest_client.delete("/regions:batch", json=["ZZC", "ZZD", "ZZE"])
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json["results"]] == ["deleted", "deleted", "not found"]
+    assert rest_client.get("/regions/ZZC").status_code == 404
+
+
+def test_batch_create_existing_key_conflicts(rest_client):
+    """
+    GIVEN an event that is already in the database
+    WHEN a batch with an item that has the id of that event is posted to /events:batch
+    THEN the response is 409 with an error for that item and the event is not changed
+    """
+    event = rest_client.get("/events/1").json
+    response = rest_client.post("/events:batch", json=[dict(event, host="Overwritten")])
+    assert response.status_code == 409
+    assert list(response.json["errors"]) == ["0"]
+    assert rest_client.get("/events/1").json["host"] == event["host"]
+
+
+@pytest.mark.parametrize("method, url, items, invalid", [
+    ("patch", "/events:batch", [{"id": [1]}, {"id": 1, "host": "Rome"}], ["0"]),
+    ("patch", "/events:batch", [{"id": 1, "host": "Rome"}, {"id": True}], ["1"]),
+    ("delete", "/events:batch", [{"a": 1}, 2, "3"], ["0", "2"]),
+    ("delete", "/regions:batch", ["ZZF", 5], ["1"]),
+])
+def test_batch_invalid_keys(rest_client, method, url, items, invalid):
+    """
+    GIVEN a batch where some of the keys are not a single value of the primary key type
+    WHEN the batch is sent to the route
+    THEN the response is 400 with an error for each invalid key
+    """
+    response = getattr(rest_client, method)(url, json=items)
+    assert response.status_code == 400
+    assert sorted(response.json["errors"]) == invalid
+
+
+def test_batch_delete_region_with_events_conflicts(rest_client):
+    """
+    GIVEN a region that events still refer to
+    WHEN its NOC code is sent to DELETE /regions:batch
+    THEN the response is 409 with an error for that code and the region and its events are not changed
+    """
+    response = rest_client.delete("/regions:batch", json=["GBR"])
+    assert response.status_code == 409
+    assert list(response.json["errors"]) == ["0"]
+    assert rest_client.get("/regions/GBR").status_code == 200
+    assert rest_client.get("/events/14").json["NOC"] == "GBR"
+
+
+def test_load_data_skips_unchanged_files(loader_app):
+    """
+    GIVEN empty region and event tables
+    WHEN load_data is called twice without the CSV files changing
+    THEN the first call loads every row and the second call loads nothing
+    """
+    assert load_data(db) == {"region": 230, "event": 32}
+    assert load_data(db) == {}
+
+
+def test_load_data_reloads_empty_table(loader_app):
+    """
+    GIVEN the data has been loaded and then every event has been deleted
+    WHEN load_data is called again
+    THEN the events are loaded again although the CSV file has not changed
+    """
+    load_data(db)
+    db.session.execute(db.delete(Event))
+    db.session.commit()
+    assert load_data(db) == {"event": 32}
+
+
+def test_load_data_reloads_after_drop_all(loader_app):
+    """
+    GIVEN the data has been loaded and then the tables have been dropped and created again
+    WHEN load_data is called again
+    THEN every row is loaded again
+    """
+    load_data(db)
+    db.drop_all()
+    db.create_all()
+    assert load_data(db) == {"region": 230, "event": 32}
+
+
+def test_load_data_adds_appended_rows(loader_app):
+    """
+    GIVEN the data has been loaded
+    WHEN a row is appended to the event CSV file and load_data is called again
+    THEN only the new row is added
+    """
+    load_data(db)
+    csv_file = loader.CSV_SOURCES["event"]["file"]
+    with open(csv_file, "a", encoding="utf-8") as f:
+        f.write("\nsummer,2032,Australia,Brisbane,AUS,24/08/2032,05/09/2032,12,,,,,,,,\n")
+    assert load_data(db) == {"event": 1}
+    assert db.session.execute(db.select(Event).filter_by(year=2032)).scalar_one().id == 33